@@ -0,0 +1,154 @@
+import asyncio
+import math
+import os
+import re
+import time
+from collections import deque
+from typing import Optional
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Route class -> (concurrency, queue size, queue timeout in seconds) defaults,
+# each overridable as ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _TIMEOUT.
+# A concurrency of 0 turns admission control off for that class.
+DEFAULT_LIMITS = {
+    "reports": (2, 8, 10.0),
+    "timer": (16, 64, 2.0),
+    "auth": (4, 16, 5.0),
+    "default": (16, 64, 5.0),
+}
+
+# Long-lived streams and probes are never queued.
+EXEMPT_PATHS = ("/healthz", "/metrics", "/sync/events")
+
+REPORT_PATH = re.compile(r"^/(reports|workspaces/[^/]+/reports)(/|$)")
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+
+class Gate:
+    """A concurrency limit with a bounded FIFO wait queue and a queueing deadline."""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+        # Exponentially weighted service time, used for Retry-After.
+        self.service_time = 0.0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        backlog = (len(self._waiters) + 1) / max(self.concurrency, 1)
+        return max(1, math.ceil(self.service_time * backlog))
+
+    async def acquire(self):
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.shed += 1
+            raise Overloaded(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                self.timed_out += 1
+                raise Overloaded(self.retry_after())
+        except asyncio.CancelledError:
+            # The client went away; hand back a slot it may just have been given.
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        self.admitted += 1
+
+    def _abandon(self, waiter) -> bool:
+        if waiter.done():
+            return False
+        waiter.cancel()
+        self._waiters.remove(waiter)
+        return True
+
+    def release(self, elapsed: Optional[float] = None):
+        if elapsed is not None:
+            self.service_time = elapsed if not self.service_time else 0.8 * self.service_time + 0.2 * elapsed
+        # A freed slot passes straight to the oldest waiter.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "service_time": round(self.service_time, 4),
+        }
+
+def _create_gate(name: str, defaults):
+    concurrency, queue_size, timeout = defaults
+    prefix = f"ADMISSION_{name.upper()}_"
+    return Gate(
+        name,
+        int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+        int(os.getenv(prefix + "QUEUE", str(queue_size))),
+        float(os.getenv(prefix + "TIMEOUT", str(timeout))),
+    )
+
+gates = {name: _create_gate(name, defaults) for name, defaults in DEFAULT_LIMITS.items()}
+
+def route_class(request: Request) -> Optional[str]:
+    path = request.url.path
+    if request.method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if REPORT_PATH.match(path):
+        return "reports"
+    if path.startswith(("/timer/", "/sync/")):
+        return "timer"
+    if path.startswith("/auth/"):
+        return "auth"
+    return "default"
+
+def stats():
+    return {name: gate.stats() for name, gate in gates.items()}
+
+async def admission_control(request: Request, call_next):
+    name = route_class(request)
+    gate = gates.get(name)
+    if gate is None or gate.concurrency <= 0:
+        return await call_next(request)
+
+    try:
+        await gate.acquire()
+    except Overloaded as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server is busy, please retry"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # Streamed bodies (exports) are sent after the slot is released.
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        gate.release(time.perf_counter() - started)
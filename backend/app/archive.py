@@ -0,0 +1,244 @@
+import argparse
+import json
+import mmap
+import os
+import shutil
+import uuid
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from . import models
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.getcwd(), "archive"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+
+# Column name -> storage kind. "time" is int64 microseconds since the epoch,
+# "float" is float64, "json" is a zlib compressed JSON list.
+COLUMNS = {
+    "id": "json",
+    "description": "json",
+    "start_time": "time",
+    "end_time": "time",
+    "duration": "float",
+    "tags": "json",
+    "project_id": "json",
+    "created_at": "time",
+    "updated_at": "time",
+}
+
+EPOCH = datetime(1970, 1, 1)
+NULL_TIME = -(2 ** 63)
+NULL_FLOAT = float("nan")
+
+class ArchivedEntry:
+    """A time entry read back from the archive; unloaded columns are None."""
+
+    __slots__ = tuple(COLUMNS) + ("user_id",)
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+def _encode(kind: str, values: List) -> bytes:
+    if kind == "time":
+        raw = array("q", [
+            NULL_TIME if v is None else (v - EPOCH) // timedelta(microseconds=1) for v in values
+        ]).tobytes()
+    elif kind == "float":
+        raw = array("d", [NULL_FLOAT if v is None else v for v in values]).tobytes()
+    else:
+        raw = json.dumps(values).encode()
+    return zlib.compress(raw, 6)
+
+def _decode(kind: str, raw: bytes) -> List:
+    if kind == "time":
+        values = array("q")
+        values.frombytes(raw)
+        return [None if v == NULL_TIME else EPOCH + timedelta(microseconds=v) for v in values]
+    if kind == "float":
+        values = array("d")
+        values.frombytes(raw)
+        return [None if v != v else v for v in values]
+    return json.loads(raw)
+
+def _month_key(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+def _segment_dir(user_id: str, month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, user_id, month)
+
+def _read_column(segment: str, name: str) -> List:
+    with open(os.path.join(segment, f"{name}.col"), "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            raw = zlib.decompress(mapped)
+    return _decode(COLUMNS[name], raw)
+
+def _read_segment(segment: str, columns: Iterable[str]):
+    return {name: _read_column(segment, name) for name in columns}
+
+def _write_segment(segment: str, data: dict):
+    # Build the new segment next to the old one and swap directories.
+    tmp = f"{segment}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp)
+    for name, kind in COLUMNS.items():
+        with open(os.path.join(tmp, f"{name}.col"), "wb") as f:
+            f.write(_encode(kind, data[name]))
+            f.flush()
+            os.fsync(f.fileno())
+
+    old = None
+    if os.path.isdir(segment):
+        old = f"{segment}.{uuid.uuid4().hex}.old"
+        os.rename(segment, old)
+    os.rename(tmp, segment)
+    if old:
+        shutil.rmtree(old)
+
+def _segments(user_id: str, start: Optional[datetime], end: Optional[datetime]):
+    user_dir = os.path.join(ARCHIVE_DIR, user_id)
+    if not os.path.isdir(user_dir):
+        return []
+
+    first = _month_key(start) if start else None
+    last = _month_key(end) if end else None
+    months = []
+    for month in sorted(os.listdir(user_dir)):
+        if len(month) != 7:  # skips in-progress .tmp/.old directories
+            continue
+        if (first and month < first) or (last and month > last):
+            continue
+        months.append(os.path.join(user_dir, month))
+    return months
+
+def iter_scan(
+    user_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[Iterable[str]] = None,
+    project_id: Optional[str] = None,
+    search_term: Optional[str] = None,
+    newest_first: bool = False,
+) -> Iterator[ArchivedEntry]:
+    """Yield archived entries of a user one segment at a time.
+
+    Segments come oldest month first, or newest month first with the
+    segment's entries sorted by descending start_time when newest_first
+    is set; only one segment is held in memory.
+    """
+    columns = list(columns or COLUMNS)
+    needed = set(columns) | {"start_time"}
+    if project_id:
+        needed.add("project_id")
+    if search_term:
+        needed.add("description")
+        search_term = search_term.lower()
+
+    segments = _segments(user_id, start, end)
+    for segment in reversed(segments) if newest_first else segments:
+        data = _read_segment(segment, needed)
+        rows = range(len(data["start_time"]))
+        if newest_first:
+            rows = sorted(rows, key=data["start_time"].__getitem__, reverse=True)
+        for i in rows:
+            start_time = data["start_time"][i]
+            if (start and start_time < start) or (end and start_time > end):
+                continue
+            if project_id and data["project_id"][i] != project_id:
+                continue
+            if search_term and search_term not in (data["description"][i] or "").lower():
+                continue
+            yield ArchivedEntry(user_id=user_id, **{name: data[name][i] for name in needed})
+
+def scan(
+    user_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[Iterable[str]] = None,
+    project_id: Optional[str] = None,
+    search_term: Optional[str] = None,
+) -> List[ArchivedEntry]:
+    """Read archived entries of a user, loading only the requested columns.
+
+    start_time and any column needed for filtering are always loaded.
+    """
+    return list(iter_scan(user_id, start, end, columns, project_id, search_term))
+
+def project_totals(user_id: Optional[str] = None):
+    """Per-project (entry_count, total_duration, last_entry_at) over the archive."""
+    totals = {}
+    if not os.path.isdir(ARCHIVE_DIR):
+        return totals
+
+    for owner in [user_id] if user_id else os.listdir(ARCHIVE_DIR):
+        for segment in _segments(owner, None, None):
+            data = _read_segment(segment, ("project_id", "duration", "start_time"))
+            for project_id, duration, start_time in zip(data["project_id"], data["duration"], data["start_time"]):
+                if project_id is None:
+                    continue
+                count, total, last = totals.get(project_id, (0, 0.0, None))
+                totals[project_id] = (count + 1, total + (duration or 0), max(last, start_time) if last else start_time)
+    return totals
+
+def archive_entries(db: Session, cutoff: datetime, batch_size: int = 5000):
+    """Move completed entries that started before `cutoff` into the archive.
+
+    No tombstones are written; see sync.changes_since.
+    """
+    user_ids = [row[0] for row in db.query(models.TimeEntry.user_id).filter(
+        models.TimeEntry.start_time < cutoff,
+        models.TimeEntry.end_time != None
+    ).distinct().all()]
+
+    archived = 0
+    for user_id in user_ids:
+        columns = [getattr(models.TimeEntry, name) for name in COLUMNS]
+        rows = db.query(*columns).filter(
+            models.TimeEntry.user_id == user_id,
+            models.TimeEntry.start_time < cutoff,
+            models.TimeEntry.end_time != None
+        ).order_by(models.TimeEntry.start_time).yield_per(batch_size)
+
+        months = {}
+        for row in rows:
+            month = months.setdefault(_month_key(row.start_time), {name: [] for name in COLUMNS})
+            for name in COLUMNS:
+                month[name].append(getattr(row, name))
+
+        for month, data in months.items():
+            segment = _segment_dir(user_id, month)
+            if os.path.isdir(segment):
+                existing = _read_segment(segment, COLUMNS)
+                known = set(existing["id"])
+                keep = [i for i, entry_id in enumerate(data["id"]) if entry_id not in known]
+                data = {name: existing[name] + [data[name][i] for i in keep] for name in COLUMNS}
+            _write_segment(segment, data)
+
+        # Rows leave the hot table only after their segment is on disk.
+        ids = [entry_id for month in months.values() for entry_id in month["id"]]
+        for i in range(0, len(ids), batch_size):
+            db.query(models.TimeEntry).filter(
+                models.TimeEntry.id.in_(ids[i:i + batch_size])
+            ).delete(synchronize_session=False)
+        db.commit()
+        archived += len(ids)
+
+    return archived
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move old time entries into the columnar archive")
+    parser.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = archive_entries(db, datetime.utcnow() - timedelta(days=args.after_days))
+        print(f"Archived {count} time entries into {ARCHIVE_DIR}")
+    finally:
+        db.close()
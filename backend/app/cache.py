@@ -0,0 +1,273 @@
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory" or "sqlite"
+CACHE_PATH = os.getenv("CACHE_PATH", "/tmp/timekeeper-cache.db")
+# The memory backend's bound per worker; the sqlite backend's bound for the shared store.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# The sqlite backend's in-process copy of hot entries, per worker.
+CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Cached values are shared between callers and must not be mutated.
+
+def _size(value) -> int:
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+class MemoryCache:
+    """An LRU cache held in this process only, bounded by the pickled size of its values."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] and entry[2] < time.time():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None):
+        size = _size(value) if size is None else size
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, size, time.time() + ttl if ttl else None)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+class SQLiteCache:
+    """A cache in a local SQLite file shared by all workers on the machine.
+
+    Each worker keeps a small in-process copy of hot entries in front of it.
+    Every set and delete is appended to an invalidation log and bumps a
+    version number in a shared memory-mapped file; a worker that sees the
+    version move drops the logged keys from its copy before its next read,
+    so all workers observe a write as soon as it commits.
+    """
+
+    prune_every = 1000
+    log_retention = 300
+    touch_after = 60
+
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES, local_max_bytes: int = CACHE_LOCAL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = MemoryCache(local_max_bytes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires_at REAL, used_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_used_at ON entries (used_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS invalidations (seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO usage (id, bytes) VALUES (1, 0)")
+        conn.execute("COMMIT")
+
+        fd = os.open(path + ".version", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._version = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+        self._seen = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()[0]
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a cache survives nothing it must not lose
+            self._local.conn = conn
+        return conn
+
+    def _sync(self, conn):
+        # The version is a hint bumped by writers; the log itself is the source of truth.
+        if struct.unpack_from("q", self._version)[0] == self._seen:
+            return
+        with self._lock:
+            rows = conn.execute(
+                "SELECT seq, key FROM invalidations WHERE seq > ? ORDER BY seq", (self._seen,)
+            ).fetchall()
+            if rows and rows[0][0] != self._seen + 1:
+                # The log was pruned past what this worker saw; start over.
+                self.local.clear()
+            for seq, key in rows:
+                self.local.delete(key)
+                self._seen = seq
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        self._sync(conn)
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        now = time.time()
+        row = conn.execute("SELECT value, size, expires_at, used_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[2] and row[2] < now):
+            self.misses += 1
+            return None
+        blob, size, expires_at, used_at = row
+        if now - used_at > self.touch_after:
+            # Recency for eviction is only tracked coarsely, to keep reads from writing.
+            conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+
+        value = pickle.loads(blob)
+        self.local.set(key, value, expires_at - now if expires_at else None, size)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            self.delete(key)
+            return
+        now = time.time()
+        self._write(key, lambda conn, old: self._store(conn, key, blob, now + ttl if ttl else None, now, old))
+        self.local.set(key, value, ttl, len(blob))
+
+    def delete(self, key: str):
+        self._write(key, lambda conn, old: self._remove(conn, key, old))
+        self.local.delete(key)
+
+    def _store(self, conn, key: str, blob: bytes, expires_at: Optional[float], now: float, old: int) -> int:
+        conn.execute(
+            "INSERT INTO entries (key, value, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+            "expires_at = excluded.expires_at, used_at = excluded.used_at",
+            (key, blob, len(blob), expires_at, now)
+        )
+        return len(blob) - old
+
+    def _remove(self, conn, key: str, old: int) -> int:
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return -old
+
+    def _write(self, key: str, change):
+        """Apply change(conn, old size) -> size delta, log the key and keep the store bounded."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            delta = change(conn, row[0] if row else 0)
+            conn.execute("UPDATE usage SET bytes = bytes + ? WHERE id = 1", (delta,))
+            total = conn.execute("SELECT bytes FROM usage WHERE id = 1").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total, key, now)
+
+            seq = conn.execute("INSERT INTO invalidations (key, at) VALUES (?, ?)", (key, now)).lastrowid
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                conn.execute("DELETE FROM invalidations WHERE at < ?", (now - self.log_retention,))
+                conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+                conn.execute("UPDATE usage SET bytes = (SELECT COALESCE(SUM(size), 0) FROM entries) WHERE id = 1")
+            # Written under the write lock, so the version only moves forward.
+            struct.pack_into("q", self._version, 0, seq)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, total: int, keep: str, now: float):
+        # Expired entries go first, then the least recently used.
+        rows = conn.execute(
+            "SELECT key, size FROM entries WHERE key != ? "
+            "ORDER BY CASE WHEN expires_at < ? THEN 0 ELSE 1 END, used_at",
+            (keep, now)
+        )
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        rows.close()
+        # Evicted values are still correct wherever they are held, so they are not logged.
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        conn.execute("UPDATE usage SET bytes = ? WHERE id = 1", (total,))
+        self.evictions += len(evicted)
+
+    def stats(self):
+        conn = self._connect()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "local": self.local.stats(),
+        }
+
+def create_cache():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_PATH)
+    return MemoryCache()
+
+cache = create_cache()
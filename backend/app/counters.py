@@ -0,0 +1,129 @@
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from . import archive, models
+
+def _stamp(values: dict, seq, user_id):
+    # seq belongs to user_id's sequence space, so only their own projects take it.
+    # A shared workspace project is left to its owner's next edit rather than
+    # bumping the owner's sequence, which would lock a second user row.
+    if seq is not None:
+        values[models.Project.change_seq] = case(
+            (models.Project.user_id == user_id, seq),
+            else_=models.Project.change_seq
+        )
+
+def _apply_delta(db: Session, project_id, entry_count=0, duration=0.0, activity_at=None, seq=None, user_id=None):
+    if project_id is None:
+        return
+
+    values = {
+        models.Project.entry_count: models.Project.entry_count + entry_count,
+        models.Project.total_duration: models.Project.total_duration + duration,
+        # Counter bumps are not edits of the project itself.
+        models.Project.updated_at: models.Project.updated_at,
+    }
+    if activity_at is not None:
+        values[models.Project.last_entry_at] = case(
+            (models.Project.last_entry_at == None, activity_at),
+            (models.Project.last_entry_at < activity_at, activity_at),
+            else_=models.Project.last_entry_at
+        )
+    _stamp(values, seq, user_id)
+
+    db.query(models.Project).filter(
+        models.Project.id == project_id
+    ).update(values, synchronize_session=False)
+
+def _refresh_last_entry_at(db: Session, project_id, excluded_entry_id, seq=None, user_id=None):
+    if project_id is None:
+        return
+
+    latest = select(func.max(models.TimeEntry.start_time)).where(
+        models.TimeEntry.project_id == project_id,
+        models.TimeEntry.id != excluded_entry_id
+    ).scalar_subquery()
+
+    values = {
+        models.Project.last_entry_at: latest,
+        models.Project.updated_at: models.Project.updated_at,
+    }
+    _stamp(values, seq, user_id)
+
+    db.query(models.Project).filter(
+        models.Project.id == project_id
+    ).update(values, synchronize_session=False)
+
+def snapshot(entry: models.TimeEntry):
+    """Capture the counter-relevant state of an entry before it is modified."""
+    return (entry.id, entry.project_id, entry.duration or 0, entry.start_time)
+
+# `seq` is the sync sequence of the entry write; the affected projects the
+# writer owns are stamped with it so their counters reach syncing clients too.
+
+def entry_added(db: Session, entry: models.TimeEntry, seq=None):
+    _, project_id, duration, start_time = snapshot(entry)
+    _apply_delta(db, project_id, 1, duration, start_time, seq, entry.user_id)
+
+def entry_removed(db: Session, entry: models.TimeEntry, seq=None):
+    entry_id, project_id, duration, _ = snapshot(entry)
+    _apply_delta(db, project_id, -1, -duration, seq=seq, user_id=entry.user_id)
+    _refresh_last_entry_at(db, project_id, entry_id, seq, entry.user_id)
+
+def entry_changed(db: Session, before, entry: models.TimeEntry, seq=None):
+    # Expects the modified entry to have been flushed already.
+    entry_id, old_project_id, old_duration, old_start_time = before
+    _, project_id, duration, start_time = snapshot(entry)
+    user_id = entry.user_id
+
+    if old_project_id == project_id:
+        _apply_delta(db, project_id, 0, duration - old_duration, start_time, seq, user_id)
+        if start_time != old_start_time:
+            _refresh_last_entry_at(db, project_id, None, seq, user_id)
+        return
+
+    _apply_delta(db, old_project_id, -1, -old_duration, seq=seq, user_id=user_id)
+    _refresh_last_entry_at(db, old_project_id, entry_id, seq, user_id)
+    _apply_delta(db, project_id, 1, duration, start_time, seq, user_id)
+
+def entries_moved_in(db: Session, project_id, entry_count: int, duration: float, last_start, seq=None, user_id=None):
+    _apply_delta(db, project_id, entry_count, duration, last_start, seq, user_id)
+
+def duration_added(db: Session, project_id, duration: float, seq=None, user_id=None):
+    _apply_delta(db, project_id, 0, duration, seq=seq, user_id=user_id)
+
+def recompute_project_counters(db: Session, user_id=None):
+    """Rebuild the denormalized project counters from time_entries."""
+    entries = models.TimeEntry
+    query = db.query(models.Project)
+    if user_id is not None:
+        query = query.filter(models.Project.user_id == user_id)
+
+    updated = query.update({
+        models.Project.entry_count: select(func.count(entries.id)).where(
+            entries.project_id == models.Project.id
+        ).scalar_subquery(),
+        models.Project.total_duration: select(func.coalesce(func.sum(entries.duration), 0)).where(
+            entries.project_id == models.Project.id
+        ).scalar_subquery(),
+        models.Project.last_entry_at: select(func.max(entries.start_time)).where(
+            entries.project_id == models.Project.id
+        ).scalar_subquery(),
+        models.Project.updated_at: models.Project.updated_at,
+    }, synchronize_session=False)
+
+    # Archived entries no longer live in time_entries but still count.
+    for project_id, (count, total, last) in archive.project_totals(user_id).items():
+        _apply_delta(db, project_id, count, total, last)
+
+    return updated
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = recompute_project_counters(db)
+        db.commit()
+        print(f"Recomputed counters for {count} projects")
+    finally:
+        db.close()
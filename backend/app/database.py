@@ -1,19 +1,91 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.elements import TextClause
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Without a DATABASE_URL the app runs on a local SQLite file.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./timekeeper.db")
 
 if DATABASE_URL and 'defaultdb' in DATABASE_URL:
     DATABASE_URL = DATABASE_URL.replace('/defaultdb', '/timekeeper')
 
-engine = create_engine(DATABASE_URL)
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "4"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only syncs at checkpoints in WAL mode; commits stay durable across app crashes.
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        # Lets LIKE 'prefix%' use an index, as tag autocomplete does.
+        cursor.execute("PRAGMA case_sensitive_like=ON")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+def _sqlite_engine(read_only: bool, **kwargs):
+    sqlite_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+        **kwargs
+    )
+    event.listen(sqlite_engine, "connect", _sqlite_pragmas(read_only))
+    return sqlite_engine
+
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite allows one writer at a time: all writes share a single pooled
+    # connection, so they queue here instead of failing with "database is locked".
+    # Route handlers that touch the database are plain functions run in the
+    # threadpool; an async one would wait for a pooled connection on the event
+    # loop, stalling the request that holds it.
+    engine = _sqlite_engine(False, pool_size=1, max_overflow=0, pool_timeout=SQLITE_BUSY_TIMEOUT)
+    if engine.url.database in (None, "", ":memory:"):
+        read_engine = engine
+    else:
+        # WAL readers never block the writer, so reads get their own pool.
+        read_engine = _sqlite_engine(True, pool_size=SQLITE_READERS, max_overflow=0, pool_timeout=SQLITE_BUSY_TIMEOUT)
+else:
+    engine = create_engine(DATABASE_URL)
+    read_engine = engine
+
+def _is_read(clause) -> bool:
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return bool(getattr(clause, "is_select", False))
+
+class RoutingSession(Session):
+    """Sends reads to read_engine until the transaction first writes.
+
+    From the first write on, the session stays on the writer connection so it
+    reads its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is engine:
+            return engine
+        if self._flushing or self.info.get("writing") or not _is_read(clause):
+            self.info["writing"] = True
+            return engine
+        return read_engine
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
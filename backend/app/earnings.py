@@ -0,0 +1,170 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import Numeric, and_, case, cast, func, or_, select
+from sqlalchemy.orm import Session
+from . import archive, models, sql
+
+# Rates are looked up per entry at its start_time, most specific level first:
+# the user's rate on the project, the project's rate, then the user's default.
+# Entries without any applicable rate are tracked but not billable.
+
+DIMENSION_COLUMNS = {"project": "project_id", "month": "month", "user": "user_id"}
+
+CENTS = Decimal("0.01")
+
+def _latest_rate(entries, *criteria):
+    rates = models.Rate
+    return select(rates.hourly_rate).where(
+        *criteria,
+        rates.effective_from <= entries.start_time
+    ).order_by(rates.effective_from.desc()).limit(1).scalar_subquery()
+
+def applicable_rate(entries=models.TimeEntry):
+    """The hourly rate in force for each row of entries, as a correlated SQL expression."""
+    rates = models.Rate
+    # Each level is one probe of ix_rates_lookup.
+    return func.coalesce(
+        _latest_rate(entries, rates.project_id == entries.project_id, rates.user_id == entries.user_id),
+        _latest_rate(entries, rates.project_id == entries.project_id, rates.user_id == None),
+        _latest_rate(entries, rates.project_id == None, rates.user_id == entries.user_id),
+    )
+
+def _rate_lookup(db: Session, user_ids, project_ids):
+    """A Python rate_at(user_id, project_id, at) for entries that are not in the table."""
+    rates = models.Rate
+    history = defaultdict(lambda: ([], []))
+    for rate in db.query(rates.user_id, rates.project_id, rates.effective_from, rates.hourly_rate).filter(
+        or_(rates.project_id.in_(project_ids), and_(rates.project_id == None, rates.user_id.in_(user_ids)))
+    ).order_by(rates.effective_from):
+        starts, amounts = history[(rate.project_id, rate.user_id)]
+        starts.append(rate.effective_from)
+        amounts.append(rate.hourly_rate)
+
+    def rate_at(user_id: str, project_id: Optional[str], at: datetime):
+        levels = [(None, user_id)] if project_id is None else [(project_id, user_id), (project_id, None), (None, user_id)]
+        for level in levels:
+            starts, amounts = history.get(level, ((), ()))
+            i = bisect_right(starts, at)
+            if i:
+                return amounts[i - 1]
+        return None
+
+    return rate_at
+
+def _bucket():
+    return {"entry_count": 0, "total_duration": 0.0, "billable_duration": 0.0, "amount": Decimal(0)}
+
+def build_earnings(
+    db: Session,
+    user_ids: List[str],
+    start_date: datetime,
+    end_date: datetime,
+    group_by: List[str],
+    workspace_id: Optional[str] = None
+):
+    """Tracked and billable time with amounts, grouped by project, month and/or user.
+
+    Without a workspace the entries of user_ids are reported; with one, every
+    entry on the workspace's projects.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    entries = models.TimeEntry
+    criteria = [
+        entries.start_time >= start_date,
+        entries.start_time <= end_date,
+        entries.duration != None  # Only completed entries
+    ]
+    workspace_projects = None
+    if workspace_id:
+        workspace_projects = select(models.Project.id).where(models.Project.workspace_id == workspace_id)
+        criteria.append(entries.project_id.in_(workspace_projects))
+    else:
+        criteria.append(entries.user_id.in_(user_ids))
+
+    priced = select(
+        entries.user_id,
+        entries.project_id,
+        sql.month_of(entries.start_time).label("month"),
+        entries.duration,
+        applicable_rate(entries).label("rate"),
+    ).where(*criteria).subquery()
+
+    # Rates are applied and summed by the database; only the groups come back.
+    keys = [priced.c[DIMENSION_COLUMNS[dimension]] for dimension in group_by]
+    rows = db.execute(select(
+        *keys,
+        func.count(),
+        func.coalesce(func.sum(priced.c.duration), 0),
+        func.coalesce(func.sum(case((priced.c.rate != None, priced.c.duration), else_=0)), 0),
+        func.coalesce(func.sum(cast(priced.c.duration, Numeric) * priced.c.rate / 3600), 0),
+    ).group_by(*keys)).all()
+
+    buckets = {}
+    for row in rows:
+        key = tuple(row[:len(keys)])
+        count, duration, billable, amount = row[len(keys):]
+        buckets[key] = {
+            "entry_count": count,
+            "total_duration": float(duration),
+            "billable_duration": float(billable),
+            "amount": Decimal(str(amount)),
+        }
+
+    # Archived entries are few per range and are priced here.
+    project_ids = None
+    if workspace_projects is not None:
+        project_ids = set(db.scalars(workspace_projects))
+    archived = [
+        (user_id, entry)
+        for user_id in user_ids
+        for entry in archive.scan(user_id, start_date, end_date, ("duration", "project_id"))
+        if entry.duration is not None and (project_ids is None or entry.project_id in project_ids)
+    ]
+    if archived:
+        rate_at = _rate_lookup(db, user_ids, {entry.project_id for _, entry in archived if entry.project_id})
+    for user_id, entry in archived:
+        values = {"project": entry.project_id, "month": entry.start_time.strftime("%Y-%m"), "user": user_id}
+        bucket = buckets.setdefault(tuple(values[dimension] for dimension in group_by), _bucket())
+        rate = rate_at(user_id, entry.project_id, entry.start_time)
+        bucket["entry_count"] += 1
+        bucket["total_duration"] += entry.duration
+        if rate is not None:
+            bucket["billable_duration"] += entry.duration
+            bucket["amount"] += Decimal(str(entry.duration)) * rate / 3600
+
+    project_names = {}
+    if "project" in group_by:
+        project_names = dict(db.query(models.Project.id, models.Project.name).filter(
+            models.Project.id.in_([key[group_by.index("project")] for key in buckets])
+        ).all())
+    user_names = {}
+    if "user" in group_by:
+        user_names = dict(db.query(models.User.id, models.User.name).filter(
+            models.User.id.in_([key[group_by.index("user")] for key in buckets])
+        ).all())
+
+    total = _bucket()
+    result = []
+    for key, bucket in buckets.items():
+        row = dict(zip(group_by, key))
+        if "project" in row:
+            row["project_name"] = project_names.get(row["project"], "No Project")
+        if "user" in row:
+            row["user_name"] = user_names.get(row["user"])
+        for name in ("entry_count", "total_duration", "billable_duration", "amount"):
+            total[name] += bucket[name]
+        row.update(bucket, amount=float(bucket["amount"].quantize(CENTS)))
+        result.append(row)
+    result.sort(key=lambda x: tuple("" if x[d] is None else x[d] for d in group_by))
+    total["amount"] = float(total["amount"].quantize(CENTS))
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "group_by": group_by,
+        "total": total,
+        "rows": result,
+    }
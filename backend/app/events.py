@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING_EVENTS = 100
+EVENTS_CHANNEL = "timekeeper_events"
+
+class EventBus:
+    """Pub/sub of per-user events.
+
+    Streams subscribe with an asyncio queue; listeners are plain callables
+    (e.g. cache invalidation) called for every event. publish() may be called
+    from any thread.
+
+    With a relay attached, published events go through it and come back to
+    every worker process, this one included. Without one (SQLite) they only
+    reach the streams of the publishing worker, so run a single worker there.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._listeners = []
+        self.relay = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        with self._lock:
+            self._queues.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._queues.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._queues.pop(user_id, None)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def publish(self, user_id: str, event_type: str, data: dict):
+        event = {"type": event_type, "user_id": user_id, "at": datetime.utcnow(), "data": data}
+        if self.relay is not None:
+            self.relay.send(event)
+        else:
+            self.dispatch(event)
+
+    def dispatch(self, event: dict):
+        """Deliver an event to this process's listeners and streams."""
+        user_id = event["user_id"]
+        event_type = event["type"]
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Event listener failed for %s", event_type)
+
+        with self._lock:
+            subscribers = list(self._queues.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:  # the subscriber's loop has shut down
+                self.unsubscribe(user_id, queue)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: dict):
+        # A stalled client only loses its own backlog; it resyncs via /sync.
+        if queue.qsize() < MAX_PENDING_EVENTS:
+            queue.put_nowait(event)
+
+class PostgresRelay:
+    """Fans events out to all workers through PostgreSQL LISTEN/NOTIFY.
+
+    A daemon thread holds one connection outside the pool, listening on
+    EVENTS_CHANNEL. Events published while it reconnects are missed; streams
+    recover them the way they recover a dropped connection, through /sync.
+    """
+
+    reconnect_delay = 1
+
+    def __init__(self, engine, dispatch):
+        self.engine = engine
+        self.dispatch = dispatch
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def send(self, event: dict):
+        with self.engine.begin() as conn:
+            conn.execute(select(func.pg_notify(EVENTS_CHANNEL, json.dumps(event, default=str))))
+
+    def _listen(self):
+        args, kwargs = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.dbapi.connect(*args, **kwargs)
+        try:
+            conn.autocommit = True
+            conn.execute(f"LISTEN {EVENTS_CHANNEL}")
+            while not self._stopped.is_set():
+                for notify in conn.notifies(timeout=1):
+                    self.dispatch(json.loads(notify.payload))
+        finally:
+            conn.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event relay connection failed")
+                time.sleep(self.reconnect_delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="event-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+bus = EventBus()
@@ -0,0 +1,138 @@
+import io
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer
+from . import models, schemas
+
+# Binary output formats are optional: pip install pyarrow / msgpack to enable them.
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MEDIA_TYPES = {
+    ARROW_MEDIA_TYPE: "arrow",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/json": "json",
+    "application/*": "json",
+    "*/*": "json",
+}
+
+FILE_EXTENSIONS = {"arrow": "arrows", "msgpack": "msgpack"}
+
+BATCH_SIZE = 4096
+
+def entry_fields() -> List[str]:
+    """Every time entry column exposed by the JSON API, id first."""
+    columns = models.TimeEntry.__table__.columns
+    return ["id"] + [name for name in schemas.TimeEntry.model_fields if name in columns and name != "id"]
+
+def available(format: str) -> bool:
+    if format == "arrow":
+        return pyarrow is not None
+    if format == "msgpack":
+        return msgpack is not None
+    return format == "json"
+
+def media_type(format: str) -> str:
+    return ARROW_MEDIA_TYPE if format == "arrow" else MSGPACK_MEDIA_TYPE
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick "json", "arrow" or "msgpack" from an Accept header, honouring q-values.
+
+    JSON is the fallback when nothing acceptable is enabled, as it was before
+    the binary formats existed.
+    """
+    if not accept:
+        return "json"
+
+    offered = []
+    for i, part in enumerate(accept.split(",")):
+        media, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media.lower() in MEDIA_TYPES and quality > 0:
+            offered.append((-quality, i, MEDIA_TYPES[media.lower()]))
+
+    for _, _, format in sorted(offered):
+        if available(format):
+            return format
+    return "json"
+
+def require(format: str):
+    if not available(format):
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"The {format} format is not enabled on this server"
+        )
+
+def _arrow_type(column_type):
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp("us", tz="UTC")
+    if isinstance(column_type, Float):
+        return pyarrow.float64()
+    if isinstance(column_type, (Integer, BigInteger)):
+        return pyarrow.int64()
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, models.ArrayType):
+        return pyarrow.list_(pyarrow.string())
+    return pyarrow.string()
+
+def _batches(rows: Iterable, columns: List[str]):
+    # Rows become column lists here; no per-row model is ever built.
+    batch = {name: [] for name in columns}
+    size = 0
+    for row in rows:
+        for name in columns:
+            batch[name].append(getattr(row, name))
+        size += 1
+        if size == BATCH_SIZE:
+            yield batch
+            batch = {name: [] for name in columns}
+            size = 0
+    if size:
+        yield batch
+
+def _utc(values):
+    # msgpack's timestamp type needs aware datetimes; stored times are naive UTC.
+    return [value.replace(tzinfo=timezone.utc) if isinstance(value, datetime) else value for value in values]
+
+def encode(format: str, rows: Iterable, model, columns: List[str]):
+    """Encode rows (anything with the column attributes) as a stream of byte chunks.
+
+    arrow is an Arrow IPC stream with one record batch per chunk; msgpack is a
+    sequence of maps of column name -> list of values, one per chunk.
+    """
+    table_columns = model.__table__.columns
+    if format == "arrow":
+        schema = pyarrow.schema([(name, _arrow_type(table_columns[name].type)) for name in columns])
+        sink = io.BytesIO()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            for batch in _batches(rows, columns):
+                writer.write_batch(pyarrow.record_batch(
+                    [pyarrow.array(batch[field.name], field.type) for field in schema], schema=schema
+                ))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        yield sink.getvalue()
+    else:
+        packer = msgpack.Packer(datetime=True)
+        for batch in _batches(rows, columns):
+            yield packer.pack({name: _utc(values) for name, values in batch.items()})
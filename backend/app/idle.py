@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from . import counters, events, models, outbox, sql, suggestions
+from .database import SessionLocal
+
+load_dotenv()
+
+# Default for users without their own idle_timeout_minutes; 0 disables the sweep.
+IDLE_TIMEOUT_MINUTES = int(os.getenv("IDLE_TIMEOUT_MINUTES", str(12 * 60)))
+IDLE_SWEEP_INTERVAL = float(os.getenv("IDLE_SWEEP_INTERVAL", "300"))
+
+logger = logging.getLogger(__name__)
+
+def _timeout(user):
+    return func.coalesce(user.idle_timeout_minutes, IDLE_TIMEOUT_MINUTES)
+
+def sweep_idle_timers(db: Session, now: datetime = None):
+    """Stop every timer running past its owner's idle timeout, capped at the timeout.
+
+    One UPDATE stamps the affected users' sync sequence (taking their row
+    locks first, like every other write path), and one UPDATE caps all of
+    their stale timers.
+    """
+    now = now or datetime.utcnow()
+    entries = models.TimeEntry
+    users = models.User
+
+    bumped = db.execute(
+        update(users).where(
+            _timeout(users) > 0,
+            exists().where(
+                entries.user_id == users.id,
+                entries.end_time == None,
+                sql.add_minutes(entries.start_time, _timeout(users)) < now
+            )
+        ).values(sync_seq=users.sync_seq + 1).returning(users.id),
+        execution_options={"synchronize_session": False}
+    ).scalars().all()
+    if not bumped:
+        db.commit()
+        return []
+
+    timeout = select(_timeout(users)).where(users.id == entries.user_id).scalar_subquery()
+    capped_end = sql.add_minutes(entries.start_time, timeout)
+    stopped = db.scalars(
+        update(entries).where(
+            entries.user_id.in_(bumped),
+            entries.end_time == None,
+            capped_end < now
+        ).values(
+            end_time=capped_end,
+            duration=timeout * 60.0,
+            change_seq=select(users.sync_seq).where(users.id == entries.user_id).scalar_subquery()
+        ).returning(entries),
+        execution_options={"synchronize_session": False}
+    ).all()
+
+    added = defaultdict(float)
+    for entry in stopped:
+        added[(entry.project_id, entry.change_seq, entry.user_id)] += entry.duration
+    for (project_id, seq, user_id), duration in added.items():
+        counters.duration_added(db, project_id, duration, seq, user_id)
+    suggestions.entries_stopped(db, stopped)
+    for entry in stopped:
+        outbox.record(db, entry.user_id, "time_entry.auto_stopped", outbox.entry_data(entry))
+
+    stopped = [(entry.user_id, entry.id, entry.end_time, entry.duration, entry.change_seq) for entry in stopped]
+    db.commit()
+
+    for user_id, entry_id, end_time, duration, seq in stopped:
+        events.bus.publish(user_id, "timer.auto_stopped", {
+            "entry_id": entry_id,
+            "end_time": end_time,
+            "duration": duration,
+            "cursor": seq,
+        })
+    return stopped
+
+def _sweep():
+    db = SessionLocal()
+    try:
+        stopped = sweep_idle_timers(db)
+        if stopped:
+            logger.info("Auto-stopped %d idle timers", len(stopped))
+    finally:
+        db.close()
+
+class IdleSweeper:
+    """Runs sweep_idle_timers every `interval` seconds."""
+
+    def __init__(self, interval: float = IDLE_SWEEP_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, _sweep)
+            except Exception:
+                logger.exception("Idle timer sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+sweeper = None
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from . import models, partitions, schemas
+from .database import SessionLocal, engine
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+# A running job's lease is renewed this often and lapses when not renewed for JOB_LEASE_SECONDS.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_RESULT_TTL_HOURS = int(os.getenv("JOB_RESULT_TTL_HOURS", "24"))
+# Local to the machine that ran the job: a download has to reach that machine,
+# and results do not survive a redeploy or a machine without a persistent volume.
+JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", os.path.join(os.getcwd(), "job_results"))
+
+logger = logging.getLogger(__name__)
+
+def validate_params(kind: str, params: dict) -> dict:
+    model = schemas.ReportRequest if kind == "report" else schemas.ExportRequest
+    return model(**params).model_dump(mode="json")
+
+def _run_report(db: Session, job: models.Job, path: str):
+    from .routes.reports import build_report
+
+    report = build_report(db, job.user_id, schemas.ReportRequest(**job.params))
+    with open(path, "w") as f:
+        json.dump(report, f, default=str)
+
+def _run_export(db: Session, job: models.Job, path: str):
+    from .routes.reports import csv_stream, export_rows
+
+    request = schemas.ExportRequest(**job.params)
+    with open(path, "w", newline="") as f:
+        for chunk in csv_stream(export_rows(job.user_id, request)):
+            f.write(chunk)
+
+HANDLERS = {
+    "report": (_run_report, "json"),
+    "export": (_run_export, "csv"),
+}
+
+def claim_next_job(db: Session):
+    """Atomically move the oldest queued job to running and return it."""
+    candidate = select(models.Job.id).where(
+        models.Job.status == "queued"
+    ).order_by(models.Job.created_at).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    job = db.scalars(
+        update(models.Job).where(
+            models.Job.id == candidate,
+            models.Job.status == "queued"
+        ).values(status="running", started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow()).returning(models.Job),
+        execution_options={"synchronize_session": False}
+    ).first()
+    db.commit()
+    return job
+
+def renew_leases(db: Session, job_ids):
+    """Mark jobs this process is still running as alive, however long they take."""
+    db.query(models.Job).filter(
+        models.Job.id.in_(job_ids),
+        models.Job.status == "running"
+    ).update({models.Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+def requeue_stale_jobs(db: Session):
+    # A worker that died mid-job stops renewing its lease and would leave it running forever.
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+    db.query(models.Job).filter(
+        models.Job.status == "running",
+        func.coalesce(models.Job.heartbeat_at, models.Job.started_at) < cutoff
+    ).update({
+        models.Job.status: "queued",
+        models.Job.started_at: None,
+        models.Job.heartbeat_at: None,
+    }, synchronize_session=False)
+    db.commit()
+
+def expire_results(db: Session):
+    cutoff = datetime.utcnow() - timedelta(hours=JOB_RESULT_TTL_HOURS)
+    expired = db.query(models.Job).filter(
+        models.Job.status == "succeeded",
+        models.Job.finished_at < cutoff
+    ).all()
+    for job in expired:
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+        job.status = "expired"
+        job.result_path = None
+    db.commit()
+
+def run_job(job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.get(models.Job, job_id)
+        handler, extension = HANDLERS[job.kind]
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+        path = os.path.join(JOB_RESULTS_DIR, f"{job.id}.{extension}")
+        try:
+            handler(db, job, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        else:
+            job.status = "succeeded"
+            job.result_path = path
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+class JobRunner:
+    """Polls the jobs table and runs claimed jobs on a bounded thread pool."""
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.running = {}  # future -> job id
+        self.wakeup = asyncio.Event()
+        self._task = None
+
+    def notify(self):
+        self.wakeup.set()
+
+    def _housekeeping(self):
+        db = SessionLocal()
+        try:
+            requeue_stale_jobs(db)
+            expire_results(db)
+        finally:
+            db.close()
+        if engine.dialect.name == "postgresql":
+            # A server up for longer than PARTITION_MONTHS_AHEAD would otherwise
+            # start filling the default partition, which then has to be moved
+            # out under lock when the month is attached.
+            try:
+                with engine.begin() as conn:
+                    created = partitions.ensure_upcoming(conn)
+                if created:
+                    logger.info("Created partitions %s", ", ".join(created))
+            except Exception:
+                logger.exception("Could not create upcoming partitions")
+
+    def _heartbeat(self, job_ids):
+        db = SessionLocal()
+        try:
+            renew_leases(db, job_ids)
+        finally:
+            db.close()
+
+    def _claim(self):
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db)
+            return job.id if job else None
+        finally:
+            db.close()
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        last_housekeeping = None
+        last_heartbeat = datetime.utcnow()
+        while True:
+            try:
+                now = datetime.utcnow()
+                if self.running and now - last_heartbeat > timedelta(seconds=JOB_HEARTBEAT_SECONDS):
+                    await loop.run_in_executor(None, self._heartbeat, list(self.running.values()))
+                    last_heartbeat = now
+                if last_housekeeping is None or now - last_housekeeping > timedelta(seconds=JOB_LEASE_SECONDS):
+                    await loop.run_in_executor(None, self._housekeeping)
+                    last_housekeeping = now
+
+                while len(self.running) < self.workers:
+                    job_id = await loop.run_in_executor(None, self._claim)
+                    if job_id is None:
+                        break
+                    future = loop.run_in_executor(self.executor, run_job, job_id)
+                    self.running[future] = job_id
+                    future.add_done_callback(self._finished)
+            except Exception:
+                logger.exception("Job runner iteration failed")
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finished(self, future):
+        self.running.pop(future, None)
+        self.wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+runner = None
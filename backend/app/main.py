@@ -1,24 +1,70 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import JSONResponse
-import psycopg
+from sqlalchemy.exc import DBAPIError
+import logging
 import os
 from dotenv import load_dotenv
 
+from . import admission, cache, events, idle, jobs, outbox, overlaps, partitions, profiling, ratelimit, singleflight
 from .database import engine, Base
-from .routes import auth, projects, timer, reports
+from .routes import admin, auth, projects, rates, timer, reports, sync, workspaces
+from .routes import tags as tags_routes
+from .routes import jobs as jobs_routes
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 Base.metadata.create_all(bind=engine)
 
+if engine.dialect.name == "postgresql":
+    with engine.begin() as conn:
+        if partitions.is_partitioned(conn):
+            partitions.ensure_partitions(conn)
+    # Overlap queries work without the index, only slower; never fail startup over it.
+    try:
+        with engine.begin() as conn:
+            overlaps.ensure_period_index(conn)
+    except DBAPIError:
+        logger.exception("Could not build %s", overlaps.PERIOD_INDEX)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if engine.dialect.name == "postgresql":
+        events.bus.relay = events.PostgresRelay(engine, events.bus.dispatch)
+        events.bus.relay.start()
+    jobs.runner = jobs.JobRunner()
+    jobs.runner.start()
+    idle.sweeper = idle.IdleSweeper()
+    idle.sweeper.start()
+    if outbox.enabled():
+        outbox.dispatcher = outbox.OutboxDispatcher()
+        outbox.dispatcher.start()
+    yield
+    if outbox.dispatcher:
+        await outbox.dispatcher.stop()
+        outbox.dispatcher = None
+    await idle.sweeper.stop()
+    idle.sweeper = None
+    await jobs.runner.stop()
+    jobs.runner = None
+    if events.bus.relay:
+        events.bus.relay.stop()
+        events.bus.relay = None
+
 app = FastAPI(
     title="TimeKeeperWeb API",
     description="API for time tracking and project management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Registered before the CORS middleware so shed 503 responses carry CORS headers.
+app.middleware("http")(admission.admission_control)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all origins
@@ -37,15 +83,35 @@ async def add_cors_headers(request: Request, call_next):
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
 
+# Without an admin token or a sample rate the profiler is not even installed.
+if profiling.enabled():
+    app.middleware("http")(profiling.profile_requests)
+
 app.include_router(auth.router)
 app.include_router(projects.router)
 app.include_router(timer.router)
 app.include_router(reports.router)
+app.include_router(jobs_routes.router)
+app.include_router(sync.router)
+app.include_router(workspaces.router)
+app.include_router(tags_routes.router)
+app.include_router(rates.router)
+app.include_router(admin.router)
 
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", dependencies=[Depends(admin.require_admin)])
+def metrics():
+    return {
+        "auth_throttled": ratelimit.store.throttled_counts(),
+        "admission": admission.stats(),
+        "coalesced_reports": singleflight.flights.stats(),
+        "outbox": outbox.dispatcher.stats() if outbox.dispatcher else None,
+        "cache": cache.cache.stats(),
+    }
+
 @app.get("/")
 async def root():
     return {
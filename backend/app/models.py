@@ -1,7 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, DateTime, Boolean, Text
+from sqlalchemy import Column, BigInteger, Integer, Numeric, String, Float, ForeignKey, Table, DateTime, Boolean, Text, Index, Uuid
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy import TypeDecorator
 import json
@@ -10,6 +9,7 @@ from .database import Base
 
 class ArrayType(TypeDecorator):
     impl = Text
+    cache_ok = True
     
     def process_bind_param(self, value, dialect):
         if value is not None:
@@ -21,38 +21,89 @@ class ArrayType(TypeDecorator):
             return json.loads(value)
         return []
 
+class JSONType(TypeDecorator):
+    impl = Text
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is not None:
+            return json.dumps(value)
+        return None
+        
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            return json.loads(value)
+        return None
+
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True)
     email = Column(String, unique=True, index=True)
     name = Column(String)
     hashed_password = Column(String)
     photo_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=func.now())
+    sync_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+    prevent_overlaps = Column(Boolean, nullable=False, default=False, server_default="0")
+    idle_timeout_minutes = Column(Integer, nullable=True)
     
     time_entries = relationship("TimeEntry", back_populates="user")
     projects = relationship("Project", back_populates="user")
+    memberships = relationship("WorkspaceMember", back_populates="user")
+
+class Workspace(Base):
+    __tablename__ = "workspaces"
+    
+    id = Column(Uuid(as_uuid=False), primary_key=True)
+    name = Column(String)
+    created_at = Column(DateTime, default=func.now())
+    owner_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    
+    members = relationship("WorkspaceMember", back_populates="workspace")
+    projects = relationship("Project", back_populates="workspace")
+
+class WorkspaceMember(Base):
+    __tablename__ = "workspace_members"
+    
+    workspace_id = Column(Uuid(as_uuid=False), ForeignKey("workspaces.id"), primary_key=True)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), primary_key=True, index=True)
+    role = Column(String, nullable=False, default="member")
+    joined_at = Column(DateTime, default=func.now())
+    
+    workspace = relationship("Workspace", back_populates="members")
+    user = relationship("User", back_populates="memberships")
 
 class Project(Base):
     __tablename__ = "projects"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True)
     name = Column(String)
     description = Column(String, nullable=True)
     color = Column(String, nullable=True)
     is_archived = Column(Boolean, default=False)
+    total_duration = Column(Float, nullable=False, default=0, server_default="0")
+    entry_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_entry_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    user_id = Column(String, ForeignKey("users.id"))
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    workspace_id = Column(Uuid(as_uuid=False), ForeignKey("workspaces.id"), nullable=True, index=True)
     
     user = relationship("User", back_populates="projects")
-    time_entries = relationship("TimeEntry", back_populates="project")
+    workspace = relationship("Workspace", back_populates="projects")
+    # Entries are detached in bulk by the database (ON DELETE SET NULL), never loaded.
+    time_entries = relationship("TimeEntry", back_populates="project", passive_deletes=True)
+    
+    __table_args__ = (
+        Index("ix_projects_user_change_seq", "user_id", "change_seq"),
+    )
 
 class TimeEntry(Base):
     __tablename__ = "time_entries"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True)
     description = Column(String)
     start_time = Column(DateTime)
     end_time = Column(DateTime, nullable=True)
@@ -60,8 +111,136 @@ class TimeEntry(Base):
     tags = Column(ArrayType, default=[])
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    user_id = Column(String, ForeignKey("users.id"))
-    project_id = Column(String, ForeignKey("projects.id"), nullable=True)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    project_id = Column(Uuid(as_uuid=False), ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    idempotency_key = Column(String, nullable=True)
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
     
     user = relationship("User", back_populates="time_entries")
     project = relationship("Project", back_populates="time_entries")
+    
+    __table_args__ = (
+        # At most one running timer per user, enforced by the database (per
+        # partition only when time_entries is partitioned; see partitions.py).
+        Index(
+            "uq_time_entries_running_timer", "user_id", unique=True,
+            postgresql_where=end_time == None, sqlite_where=end_time == None
+        ),
+        Index("uq_time_entries_idempotency_key", "user_id", "idempotency_key", unique=True),
+        Index("ix_time_entries_user_start", "user_id", "start_time"),
+        Index("ix_time_entries_project_start", "project_id", "start_time"),
+        Index("ix_time_entries_user_change_seq", "user_id", "change_seq"),
+    )
+
+class Rate(Base):
+    """An hourly rate from effective_from on.
+
+    user_id only: the user's default rate. project_id only: the project's rate.
+    Both: that user's rate on that project, which takes precedence.
+    """
+    __tablename__ = "rates"
+    
+    id = Column(Uuid(as_uuid=False), primary_key=True)
+    hourly_rate = Column(Numeric(12, 2), nullable=False)
+    effective_from = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=True)
+    project_id = Column(Uuid(as_uuid=False), ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
+    created_by = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    
+    __table_args__ = (
+        # Serves the "latest rate at start_time" lookup of every level.
+        Index("ix_rates_lookup", "project_id", "user_id", "effective_from"),
+    )
+
+class Tag(Base):
+    __tablename__ = "tags"
+    
+    id = Column(Uuid(as_uuid=False), primary_key=True)
+    name = Column(String, nullable=False)
+    # Lowercased name, the key for prefix autocomplete.
+    normalized = Column(String, nullable=False)
+    usage_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_used_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
+    
+    __table_args__ = (
+        Index("uq_tags_user_name", "user_id", "name", unique=True),
+        Index(
+            "ix_tags_user_normalized", "user_id", "normalized",
+            postgresql_ops={"normalized": "text_pattern_ops"}
+        ),
+    )
+
+class Suggestion(Base):
+    """A distinct description a user has tracked, with the project and tags it was last used with."""
+    __tablename__ = "suggestions"
+    
+    id = Column(Uuid(as_uuid=False), primary_key=True)
+    description = Column(String, nullable=False)
+    project_id = Column(Uuid(as_uuid=False), ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    tags = Column(ArrayType, default=[])
+    use_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_used_at = Column(DateTime, nullable=False)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
+    
+    __table_args__ = (
+        Index("uq_suggestions_user_description", "user_id", "description", unique=True),
+        Index("ix_suggestions_user_last_used", "user_id", "last_used_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Uuid(as_uuid=False), primary_key=True)
+    kind = Column(String)
+    params = Column(JSONType)
+    status = Column(String, default="queued")
+    result_path = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    # Renewed by the runner while the job runs; a stale one means the runner died.
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), index=True)
+    
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONType)
+    created_at = Column(DateTime, default=func.now())
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, default=func.now())
+    dispatched_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    
+    __table_args__ = (
+        # Only undelivered events are ever scanned by the dispatcher.
+        Index(
+            "ix_outbox_events_pending", "next_attempt_at", "id",
+            postgresql_where=dispatched_at == None, sqlite_where=dispatched_at == None
+        ),
+    )
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Uuid(as_uuid=False), nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, default=func.now())
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+    
+    __table_args__ = (
+        Index("ix_tombstones_user_change_seq", "user_id", "change_seq"),
+    )
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import urllib.request
+from datetime import datetime, timedelta
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session, aliased
+from dotenv import load_dotenv
+from . import models
+from .database import SessionLocal
+
+load_dotenv()
+
+OUTBOX_WEBHOOK_URL = os.getenv("OUTBOX_WEBHOOK_URL")
+OUTBOX_WEBHOOK_SECRET = os.getenv("OUTBOX_WEBHOOK_SECRET")
+OUTBOX_WEBHOOK_TIMEOUT = float(os.getenv("OUTBOX_WEBHOOK_TIMEOUT", "10"))
+OUTBOX_FILE_PATH = os.getenv("OUTBOX_FILE_PATH")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "300"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+# A claimed batch is invisible to other workers for this long; a worker that
+# dies mid-delivery leaves it to be picked up again afterwards.
+CLAIM_LEASE = timedelta(seconds=max(60, OUTBOX_WEBHOOK_TIMEOUT * 3))
+# Serializes claims across workers on PostgreSQL (pg_advisory_xact_lock key).
+CLAIM_LOCK_KEY = 0x6F7574626F78
+
+ENTRY_FIELDS = ("id", "description", "start_time", "end_time", "duration", "project_id", "tags", "change_seq")
+PROJECT_FIELDS = ("id", "name", "description", "color", "is_archived", "workspace_id", "change_seq")
+
+logger = logging.getLogger(__name__)
+
+class WebhookSink:
+    """POSTs {"events": [...]} as JSON, signed with HMAC-SHA256 when a secret is set."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, secret: str = None, timeout: float = OUTBOX_WEBHOOK_TIMEOUT):
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+
+    def deliver(self, events: List[dict]):
+        body = json.dumps({"events": events}).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Timekeeper-Signature"] = f"sha256={signature}"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        # Any non-2xx status raises HTTPError and the batch is retried.
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+class FileSink:
+    """Appends one JSON line per event to a local file."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def deliver(self, events: List[dict]):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(event) + "\n" for event in events)
+            f.flush()
+            os.fsync(f.fileno())
+
+def create_sinks():
+    configured = []
+    if OUTBOX_WEBHOOK_URL:
+        configured.append(WebhookSink(OUTBOX_WEBHOOK_URL, OUTBOX_WEBHOOK_SECRET))
+    if OUTBOX_FILE_PATH:
+        configured.append(FileSink(OUTBOX_FILE_PATH))
+    return configured
+
+# Anything with a name and a deliver(events) method can be appended here.
+sinks = create_sinks()
+
+def enabled() -> bool:
+    return bool(sinks)
+
+def record(db: Session, user_id: str, event_type: str, data: dict):
+    """Queue an event in the caller's transaction; it is only sent if that commits."""
+    if not sinks:
+        return
+    db.add(models.OutboxEvent(event_type=event_type, user_id=user_id, payload=jsonable_encoder(data)))
+
+def entry_data(entry) -> dict:
+    return {field: getattr(entry, field) for field in ENTRY_FIELDS} | {"user_id": entry.user_id}
+
+def project_data(project) -> dict:
+    return {field: getattr(project, field) for field in PROJECT_FIELDS} | {"user_id": project.user_id}
+
+def claim_batch(db: Session, now: datetime, limit: int = OUTBOX_BATCH_SIZE):
+    """Lease the oldest due events to this worker; the caller commits the lease.
+
+    Events of a user are delivered in id order: none is claimed while an
+    earlier one of the same user is leased to a worker or backing off.
+    """
+    events = models.OutboxEvent
+    earlier = aliased(models.OutboxEvent)
+    if db.bind.dialect.name == "postgresql":
+        # Without this, two claims could both see an earlier event as due and
+        # one would skip past it while the other holds it.
+        db.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_KEY)))
+    due = select(events.id).where(
+        events.dispatched_at == None,
+        events.next_attempt_at <= now,
+        ~exists().where(
+            earlier.user_id == events.user_id,
+            earlier.id < events.id,
+            earlier.dispatched_at == None,
+            earlier.next_attempt_at > now
+        )
+    ).order_by(events.id).limit(limit).with_for_update(skip_locked=True)
+
+    claimed = db.scalars(
+        update(events).where(
+            events.id.in_(due),
+            events.dispatched_at == None
+        ).values(next_attempt_at=now + CLAIM_LEASE).returning(events),
+        execution_options={"synchronize_session": False}
+    ).all()
+    return sorted(claimed, key=lambda event: event.id)
+
+def backoff(attempts: int) -> float:
+    return min(OUTBOX_MAX_BACKOFF, 2 ** attempts) * random.uniform(0.5, 1)
+
+def dispatch_batch(db: Session, now: datetime = None):
+    """Deliver one batch to every sink. Returns (events sent, retry delay or None)."""
+    now = now or datetime.utcnow()
+    batch = claim_batch(db, now)
+    if not batch:
+        db.commit()
+        return 0, None
+
+    ids = [event.id for event in batch]
+    attempts = max(event.attempts for event in batch) + 1
+    payload = [{
+        "id": event.id,
+        "type": event.event_type,
+        "user_id": event.user_id,
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    } for event in batch]
+    db.commit()
+
+    # Delivery is at least once: a failing sink gets the whole batch again, so
+    # consumers dedupe on the event id. Until then the batch's users' later
+    # events wait behind it (see claim_batch).
+    try:
+        for sink in sinks:
+            sink.deliver(payload)
+    except Exception as e:
+        delay = backoff(attempts)
+        logger.warning("Outbox delivery of %d events failed (attempt %d): %s", len(ids), attempts, e)
+        db.execute(update(models.OutboxEvent).where(models.OutboxEvent.id.in_(ids)).values(
+            attempts=models.OutboxEvent.attempts + 1,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=delay),
+            last_error=str(e)[:1000]
+        ))
+        db.commit()
+        return 0, delay
+
+    db.execute(update(models.OutboxEvent).where(models.OutboxEvent.id.in_(ids)).values(
+        dispatched_at=datetime.utcnow(),
+        last_error=None
+    ))
+    db.commit()
+    return len(ids), None
+
+def purge_dispatched(db: Session, now: datetime = None):
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=OUTBOX_RETENTION_HOURS)
+    db.query(models.OutboxEvent).filter(
+        models.OutboxEvent.dispatched_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def _dispatch():
+    db = SessionLocal()
+    try:
+        return dispatch_batch(db)
+    finally:
+        db.close()
+
+def _purge():
+    db = SessionLocal()
+    try:
+        purge_dispatched(db)
+    finally:
+        db.close()
+
+class OutboxDispatcher:
+    """Drains the outbox in batches off the request path, backing off while sinks fail."""
+
+    def __init__(self, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.delivered = 0
+        self.failed_batches = 0
+        self._task = None
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        last_purge = None
+        while True:
+            delay = self.poll_interval
+            try:
+                now = datetime.utcnow()
+                if last_purge is None or now - last_purge > timedelta(minutes=5):
+                    await loop.run_in_executor(None, _purge)
+                    last_purge = now
+
+                sent, retry_in = await loop.run_in_executor(None, _dispatch)
+                self.delivered += sent
+                if retry_in is not None:
+                    self.failed_batches += 1
+                    delay = retry_in
+                elif sent == OUTBOX_BATCH_SIZE:
+                    delay = 0  # more are probably waiting
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {"delivered": self.delivered, "failed_batches": self.failed_batches}
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+dispatcher = None
@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import DateTime, and_, literal, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, aliased
+from . import models, sql
+
+PERIOD_INDEX = "ix_time_entries_period"
+
+logger = logging.getLogger(__name__)
+
+def ensure_period_index(conn: Connection):
+    """Create the GiST index over (user_id, [start_time, end_time)) on PostgreSQL."""
+    indexdef = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"), {"name": PERIOD_INDEX}
+    ).scalar()
+    if indexdef and "greatest" not in indexdef.lower():
+        # Built with the unclamped period expression, which queries no longer match.
+        conn.execute(text(f"DROP INDEX {PERIOD_INDEX}"))
+
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {PERIOD_INDEX} ON time_entries "
+                f"USING gist (user_id, {sql.ENTRY_PERIOD})"
+            ))
+    except DBAPIError:
+        # GiST needs btree_gist for the uuid column; index the period alone without it.
+        logger.warning("btree_gist is not available, indexing time entry periods without user_id")
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {PERIOD_INDEX} ON time_entries USING gist ({sql.ENTRY_PERIOD})"
+        ))
+
+def _overlaps(entry, start, end):
+    return sql.periods_overlap(
+        entry.start_time, entry.end_time,
+        literal(start, DateTime()), literal(end, DateTime())
+    )
+
+def conflicting_entry(
+    db: Session,
+    user_id: str,
+    start: datetime,
+    end: Optional[datetime],
+    exclude_id: Optional[str] = None
+):
+    """First entry of the user intersecting [start, end); an open end runs forever."""
+    query = db.query(models.TimeEntry).filter(
+        models.TimeEntry.user_id == user_id,
+        _overlaps(models.TimeEntry, start, end)
+    )
+    if exclude_id:
+        query = query.filter(models.TimeEntry.id != exclude_id)
+    return query.first()
+
+def overlapping_pairs(
+    db: Session,
+    user_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Pairs of the user's entries that intersect, each pair reported once."""
+    a = aliased(models.TimeEntry)
+    b = aliased(models.TimeEntry)
+    now = datetime.utcnow()
+
+    # Each row of `a` probes the period index for the rows of `b` it intersects.
+    query = db.query(
+        a.id, a.start_time, a.end_time, b.id, b.start_time, b.end_time
+    ).join(b, and_(
+        b.user_id == a.user_id,
+        b.id != a.id,
+        sql.periods_overlap(a.start_time, a.end_time, b.start_time, b.end_time)
+    )).filter(
+        a.user_id == user_id,
+        a.id < b.id
+    )
+    if start or end:
+        # Intervals intersect together once each pair does, so this keeps
+        # exactly the pairs whose overlap falls in the range.
+        window = (start or datetime.min, end)
+        query = query.filter(_overlaps(a, *window), _overlaps(b, *window))
+
+    pairs = []
+    for a_id, a_start, a_end, b_id, b_start, b_end in query.order_by(a.start_time).limit(limit):
+        overlap_start = max(a_start, b_start)
+        overlap_end = min(a_end or now, b_end or now)
+        pairs.append({
+            "entry_id": a_id,
+            "other_entry_id": b_id,
+            "overlap_start": overlap_start,
+            "overlap_end": overlap_end,
+            "overlap_seconds": max((overlap_end - overlap_start).total_seconds(), 0),
+        })
+    return pairs
+
+def merged_duration(intervals: Iterable[Tuple[datetime, datetime]]) -> float:
+    """Seconds covered by the union of the intervals, so overlaps count once."""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += (current_end - current_start).total_seconds()
+            current_start, current_end = start, end
+        elif end > current_end:
+            current_end = end
+    if current_end is not None:
+        total += (current_end - current_start).total_seconds()
+    return total
+
+def entry_interval(entry):
+    return entry.start_time, entry.start_time + timedelta(seconds=entry.duration)
@@ -0,0 +1,202 @@
+import argparse
+import os
+import re
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+PARENT_TABLE = "time_entries"
+DEFAULT_PARTITION = "time_entries_default"
+
+# Only queries that bound start_time are pruned to the partitions they cover,
+# as date-filtered reports and exports are. A listing with no bound, such as
+# /timer/entries (ORDER BY start_time DESC LIMIT n), plans a Merge Append over
+# the (user_id, start_time) index of every partition: each probe is cheap, but
+# their number grows with the partitions kept, so detach old ones.
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(conn: Connection) -> bool:
+    relkind = conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"
+    ), {"name": PARENT_TABLE}).scalar()
+    return relkind == "p"
+
+def _create_partition_indexes(conn: Connection, name: str):
+    # Unique indexes on a partitioned table must contain the partition key, so
+    # these live on each partition and cannot see a running timer or a used
+    # idempotency key in another month: /sync replays starts at past times, and
+    # a start just after midnight on the 1st may land on either side. Across
+    # partitions both invariants are enforced by the application only:
+    # start_entry serializes a user's starts on the users row lock taken by
+    # sync.next_seq and inserts only WHERE NOT EXISTS such an entry.
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_running_timer ON {name} (user_id) "
+        "WHERE end_time IS NULL"
+    ))
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_idempotency_key ON {name} (user_id, idempotency_key)"
+    ))
+
+def _attach_month(conn: Connection, name: str, lower: date, upper: date):
+    # Rows that already fell into the default partition for this range have to
+    # move before the range can be attached.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        "WHERE start_time >= :lower AND start_time < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lower": lower, "upper": upper})
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+    _create_partition_indexes(conn, name)
+
+def ensure_partitions(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD, since=None):
+    """Create monthly partitions from `since` (default: this month) up to `months_ahead` ahead."""
+    current = _month_start(datetime.utcnow())
+    month = _month_start(since) if since else current
+    last = _add_months(current, months_ahead)
+
+    # Every worker runs this at boot; serialize them.
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": PARENT_TABLE})
+
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+    _create_partition_indexes(conn, DEFAULT_PARTITION)
+
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            _attach_month(conn, name, month, _add_months(month, 1))
+            created.append(name)
+        month = _add_months(month, 1)
+
+    return created
+
+def ensure_upcoming(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """ensure_partitions for a long-running server; a catalog lookup while the furthest month exists."""
+    furthest = partition_name(_add_months(_month_start(datetime.utcnow()), months_ahead))
+    if not is_partitioned(conn) or conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": furthest}
+    ).scalar() is not None:
+        return []
+    return ensure_partitions(conn, months_ahead)
+
+def list_partitions(conn: Connection):
+    rows = conn.execute(text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+        "FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :name ORDER BY child.relname"
+    ), {"name": PARENT_TABLE}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = re.search(r"TO \('([^']+)'\)", bound or "")
+        upper = datetime.fromisoformat(match.group(1)) if match else None
+        partitions.append((name, upper))
+    return partitions
+
+def detach_partitions_before(conn: Connection, cutoff: datetime, drop: bool = False):
+    """Detach monthly partitions that end on or before `cutoff`.
+
+    Detached partitions are kept as standalone tables for archiving unless
+    `drop` is set.
+    """
+    detached = []
+    for name, upper in list_partitions(conn):
+        if upper is None or upper > cutoff:
+            continue
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+        detached.append(name)
+    return detached
+
+PARTITIONED_TABLE_DDL = f"""
+CREATE TABLE {PARENT_TABLE} (
+    id UUID NOT NULL,
+    description TEXT,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP,
+    duration FLOAT,
+    tags TEXT DEFAULT '[]',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    user_id UUID REFERENCES users(id),
+    project_id UUID REFERENCES projects(id) ON DELETE SET NULL,
+    idempotency_key VARCHAR(255),
+    change_seq BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id, start_time)
+) PARTITION BY RANGE (start_time)
+"""
+
+def create_partitioned_table(conn: Connection, since=None):
+    conn.execute(text(PARTITIONED_TABLE_DDL))
+    conn.execute(text(f"CREATE INDEX ix_time_entries_user_start ON {PARENT_TABLE} (user_id, start_time)"))
+    conn.execute(text(f"CREATE INDEX ix_time_entries_project_start ON {PARENT_TABLE} (project_id, start_time)"))
+    conn.execute(text(f"CREATE INDEX ix_time_entries_user_change_seq ON {PARENT_TABLE} (user_id, change_seq)"))
+    return ensure_partitions(conn, since=since)
+
+def convert_to_partitioned(conn: Connection):
+    """Rebuild an existing plain time_entries table as a partitioned one."""
+    if is_partitioned(conn):
+        return []
+
+    oldest = conn.execute(text(f"SELECT min(start_time) FROM {PARENT_TABLE}")).scalar()
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {PARENT_TABLE}_unpartitioned"))
+    conn.execute(text(f"ALTER INDEX IF EXISTS {PARENT_TABLE}_pkey RENAME TO {PARENT_TABLE}_unpartitioned_pkey"))
+    # Free the index names for the partitioned table.
+    indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :name AND indexname != :pkey"
+    ), {"name": f"{PARENT_TABLE}_unpartitioned", "pkey": f"{PARENT_TABLE}_unpartitioned_pkey"}).scalars().all()
+    for index in indexes:
+        conn.execute(text(f"DROP INDEX {index}"))
+
+    created = create_partitioned_table(conn, since=oldest)
+    conn.execute(text(
+        f"INSERT INTO {PARENT_TABLE} (id, description, start_time, end_time, duration, tags, "
+        "created_at, updated_at, user_id, project_id, idempotency_key) "
+        "SELECT id, description, start_time, end_time, duration, tags, "
+        "created_at, updated_at, user_id, project_id, idempotency_key "
+        f"FROM {PARENT_TABLE}_unpartitioned"
+    ))
+    conn.execute(text(f"DROP TABLE {PARENT_TABLE}_unpartitioned"))
+    return created
+
+if __name__ == "__main__":
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of time_entries")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    commands.add_parser("convert", help="convert a plain time_entries table to a partitioned one")
+    detach = commands.add_parser("detach", help="detach partitions older than a cutoff")
+    detach.add_argument("--before", required=True, type=datetime.fromisoformat)
+    detach.add_argument("--drop", action="store_true", help="drop instead of keeping the detached tables")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if args.command == "ensure":
+            print("Partitions:", ", ".join(ensure_partitions(conn, args.months_ahead)))
+        elif args.command == "convert":
+            print("Created partitions:", ", ".join(convert_to_partitioned(conn)) or "already partitioned")
+        else:
+            print("Detached partitions:", ", ".join(detach_partitions_before(conn, args.before, args.drop)) or "none")
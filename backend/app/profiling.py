@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+from datetime import datetime
+from fastapi import Request
+from sqlalchemy import event
+from dotenv import load_dotenv
+from . import utils
+from .database import engine, read_engine
+
+load_dotenv()
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_EXPLAIN_MS = float(os.getenv("PROFILE_EXPLAIN_MS", "100"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+
+TRIGGER_HEADER = "x-admin-token"
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+def enabled() -> bool:
+    return bool(ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+def _running_profile(frame):
+    """The profile of the request a thread is working for, if any.
+
+    Threadpool workers run each call inside a copy of the caller's context,
+    which sits in a local of the worker's dispatch frame.
+    """
+    while frame is not None:
+        if "context" in frame.f_code.co_varnames:
+            context = frame.f_locals.get("context")
+            if isinstance(context, Context):
+                return context.get(current_profile)
+        frame = frame.f_back
+    return None
+
+class Sampler(threading.Thread):
+    """Samples, at a fixed interval, the threads working on one request."""
+
+    def __init__(self, profile: dict, loop_thread_id: int, interval: float):
+        super().__init__(name="profiler", daemon=True)
+        self.profile = profile
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.halted = threading.Event()
+
+    def run(self):
+        while not self.halted.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                if thread_id != self.loop_thread_id and _running_profile(frame) is not self.profile:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.halted.set()
+        self.join()
+
+def _explain(cursor, dialect_name: str, statement: str, parameters):
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if dialect_name == "postgresql" else "EXPLAIN QUERY PLAN "
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(col) for col in row) for row in explain_cursor.fetchall())
+    finally:
+        explain_cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is None or not conn.info.get("profile_started"):
+        return
+
+    elapsed_ms = (time.perf_counter() - conn.info["profile_started"].pop()) * 1000
+    query = {"statement": statement, "parameters": repr(parameters), "duration_ms": round(elapsed_ms, 3)}
+
+    streaming = context is not None and context.execution_options.get("stream_results")
+    if elapsed_ms >= PROFILE_EXPLAIN_MS and not executemany and not streaming \
+            and statement.lstrip().upper().startswith("SELECT"):
+        try:
+            query["plan"] = _explain(cursor, conn.dialect.name, statement, parameters)
+        except Exception as e:
+            query["plan_error"] = str(e)
+    profile["queries"].append(query)
+
+# The cursor hooks are only attached while a profiled request is running.
+_listeners_lock = threading.Lock()
+_active_profiles = 0
+
+def _attach_listeners():
+    global _active_profiles
+    with _listeners_lock:
+        if _active_profiles == 0:
+            for bind in {engine, read_engine}:
+                event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+                event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+        _active_profiles += 1
+
+def _detach_listeners():
+    global _active_profiles
+    with _listeners_lock:
+        _active_profiles -= 1
+        if _active_profiles == 0:
+            for bind in {engine, read_engine}:
+                event.remove(bind, "before_cursor_execute", _before_cursor_execute)
+                event.remove(bind, "after_cursor_execute", _after_cursor_execute)
+
+def _should_profile(request: Request) -> bool:
+    if request.url.path.startswith("/admin/"):
+        return False
+    if ADMIN_TOKEN and request.headers.get(TRIGGER_HEADER) == ADMIN_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def _save(profile: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile['id']}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f, default=str)
+    os.replace(path + ".tmp", path)
+
+    reports = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in reports[:-PROFILE_KEEP]:
+        os.remove(os.path.join(PROFILE_DIR, name))
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                profile = json.load(f)
+            profiles.append({key: profile[key] for key in (
+                "id", "method", "path", "status_code", "started_at", "duration_ms"
+            )} | {"query_count": len(profile["queries"])})
+    return profiles
+
+def load_profile(profile_id: str):
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+async def profile_requests(request: Request, call_next):
+    if not _should_profile(request):
+        return await call_next(request)
+
+    profile = {
+        "id": utils.generate_id(),
+        "method": request.method,
+        "path": request.url.path,
+        "query_string": request.url.query,
+        "started_at": datetime.utcnow(),
+        "queries": [],
+    }
+    token = current_profile.set(profile)
+    _attach_listeners()
+    # Async handlers run on the event loop thread; plain def handlers and
+    # dependencies run in the threadpool, in a copy of this request's context.
+    sampler = Sampler(profile, threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+    sampler.start()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        profile["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        sampler.stop()
+        _detach_listeners()
+        current_profile.reset(token)
+        profile["status_code"] = status_code
+        profile["samples"] = sum(sampler.stacks.values())
+        profile["stacks"] = [
+            {"stack": stack, "count": count} for stack, count in sampler.stacks.most_common(100)
+        ]
+        try:
+            _save(profile)
+        except OSError:
+            logger.exception("Could not save profile %s", profile["id"])
+
+    response.headers["X-Profile-Id"] = profile["id"]
+    return response
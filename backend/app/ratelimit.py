@@ -0,0 +1,164 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "sqlite"
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", "/tmp/timekeeper-ratelimit.db")
+RATE_LIMIT_IP_HEADER = os.getenv("RATE_LIMIT_IP_HEADER")  # e.g. Fly-Client-IP behind the Fly proxy
+
+AUTH_IP_BURST = int(os.getenv("AUTH_IP_BURST", "20"))
+AUTH_IP_PER_MINUTE = float(os.getenv("AUTH_IP_PER_MINUTE", "20"))
+# Spent only by failed attempts, from any IP, so the owner's own logins never drain it.
+AUTH_ACCOUNT_BURST = int(os.getenv("AUTH_ACCOUNT_BURST", "10"))
+AUTH_ACCOUNT_PER_MINUTE = float(os.getenv("AUTH_ACCOUNT_PER_MINUTE", "5"))
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+class MemoryBucketStore:
+    """Token buckets held in this process only."""
+
+    max_buckets = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._throttled = Counter()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float, cost: int = 1):
+        """Spend `cost` tokens if a whole token is available; cost=0 only checks."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+
+            if len(self._buckets) > self.max_buckets:
+                self._prune(capacity, rate, now)
+
+        return allowed, (0 if allowed else (1 - tokens) / rate)
+
+    def _prune(self, capacity, rate, now):
+        # Buckets that have refilled completely carry no state worth keeping.
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if _refill(tokens, updated, capacity, rate, now) >= capacity:
+                del self._buckets[key]
+
+    def record_throttled(self, scope: str):
+        with self._lock:
+            self._throttled[scope] += 1
+
+    def throttled_counts(self):
+        with self._lock:
+            return dict(self._throttled)
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file shared by all workers on the machine."""
+
+    prune_every = 1000
+    stale_after = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS throttled (scope TEXT PRIMARY KEY, count INTEGER)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: int, rate: float, now: float, cost: int = 1):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.stale_after,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return allowed, (0 if allowed else (1 - tokens) / rate)
+
+    def record_throttled(self, scope: str):
+        self._connect().execute(
+            "INSERT INTO throttled (scope, count) VALUES (?, 1) "
+            "ON CONFLICT(scope) DO UPDATE SET count = count + 1",
+            (scope,)
+        )
+
+    def throttled_counts(self):
+        return dict(self._connect().execute("SELECT scope, count FROM throttled").fetchall())
+
+def create_store():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBucketStore(RATE_LIMIT_PATH)
+    return MemoryBucketStore()
+
+store = create_store()
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_IP_HEADER and request.headers.get(RATE_LIMIT_IP_HEADER):
+        return request.headers[RATE_LIMIT_IP_HEADER]
+    return request.client.host if request.client else "unknown"
+
+def _account_key(scope: str, account: str) -> str:
+    return f"{scope}:account:{account.lower()}"
+
+def throttle_auth(request: Request, scope: str, account: Optional[str] = None):
+    """Raise 429 when the caller's IP, or the account, is out of tokens.
+
+    Every attempt spends from the IP's bucket. The account's bucket is only
+    checked here; record_auth_failure spends from it.
+
+    The stores block (the SQLite one waits on its write lock), so callers are
+    plain route functions, which FastAPI runs in its threadpool.
+    """
+    now = time.time()
+    buckets = [(f"{scope}:ip:{client_ip(request)}", AUTH_IP_BURST, AUTH_IP_PER_MINUTE / 60, 1)]
+    if account:
+        buckets.append((_account_key(scope, account), AUTH_ACCOUNT_BURST, AUTH_ACCOUNT_PER_MINUTE / 60, 0))
+
+    for key, capacity, rate, cost in buckets:
+        allowed, retry_after = store.take(key, capacity, rate, now, cost)
+        if not allowed:
+            store.record_throttled(scope)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+def record_auth_failure(scope: str, account: str):
+    """Charge a failed attempt to the account, whichever IP it came from."""
+    store.take(_account_key(scope, account), AUTH_ACCOUNT_BURST, AUTH_ACCOUNT_PER_MINUTE / 60, time.time())
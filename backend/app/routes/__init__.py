@@ -2,3 +2,9 @@ from app.routes.auth import router as auth_router
 from app.routes.projects import router as projects_router
 from app.routes.timer import router as timer_router
 from app.routes.reports import router as reports_router
+from app.routes.jobs import router as jobs_router
+from app.routes.sync import router as sync_router
+from app.routes.admin import router as admin_router
+from app.routes.workspaces import router as workspaces_router
+from app.routes.tags import router as tags_router
+from app.routes.rates import router as rates_router
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Any, Dict, List, Optional
+from .. import profiling, schemas
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not profiling.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin endpoints are disabled")
+    if x_admin_token != profiling.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    responses={403: {"description": "Forbidden"}},
+)
+
+@router.get("/profiles", response_model=List[Dict[str, Any]])
+async def get_profiles():
+    return profiling.list_profiles()
+
+@router.get("/profiles/{profile_id}", response_model=Dict[str, Any])
+async def get_profile(profile_id: schemas.EntityId):
+    profile = profiling.load_profile(profile_id)
+    
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return profile
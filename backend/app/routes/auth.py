@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils
+from .. import models, ratelimit, schemas, utils
 from ..database import get_db
 import uuid
 
@@ -12,9 +12,12 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=schemas.User)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def register(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
+    ratelimit.throttle_auth(request, "register", user.email)
+    
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user:
+        ratelimit.record_auth_failure("register", user.email)
         raise HTTPException(status_code=400, detail="Email already registered")
     
     hashed_password = utils.get_password_hash(user.password)
@@ -32,9 +35,12 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    ratelimit.throttle_auth(request, "login", form_data.username)
+    
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
     if not user or not utils.verify_password(form_data.password, user.hashed_password):
+        ratelimit.record_auth_failure("login", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -48,3 +54,18 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @router.get("/me", response_model=schemas.User)
 async def get_current_user_info(current_user: models.User = Depends(utils.get_current_user)):
     return current_user
+
+@router.put("/me", response_model=schemas.User)
+def update_current_user(
+    user_update: schemas.UserUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    update_data = user_update.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(current_user, key, value)
+    
+    db.commit()
+    db.refresh(current_user)
+    
+    return current_user
@@ -0,0 +1,106 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing import List
+from .. import jobs, models, schemas, utils
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+MEDIA_TYPES = {
+    "report": "application/json",
+    "export": "text/csv",
+}
+
+def _get_job(db: Session, job_id: str, user_id: str):
+    job = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.user_id == user_id
+    ).first()
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+@router.post("/", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+def submit_job(
+    job_data: schemas.JobCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    try:
+        params = jobs.validate_params(job_data.kind, job_data.params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    job = models.Job(
+        id=utils.generate_id(),
+        kind=job_data.kind,
+        params=params,
+        status="queued",
+        user_id=current_user.id
+    )
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    if jobs.runner:
+        jobs.runner.notify()
+
+    return job
+
+@router.get("/", response_model=List[schemas.Job])
+def get_jobs(
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return db.query(models.Job).filter(
+        models.Job.user_id == current_user.id
+    ).order_by(models.Job.created_at.desc()).offset(skip).limit(limit).all()
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def get_job(
+    job_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return _get_job(db, job_id, current_user.id)
+
+@router.get("/{job_id}/download")
+def download_job_result(
+    job_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    job = _get_job(db, job_id, current_user.id)
+
+    if job.status != "succeeded" or not job.result_path:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job result is not available (status: {job.status})"
+        )
+
+    # Results are files on the machine that ran the job. The job is left as
+    # is, since another machine sharing the database may still have the file.
+    if not os.path.exists(job.result_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Job result file is no longer available on this server"
+        )
+
+    extension = job.result_path.rsplit(".", 1)[-1]
+    return FileResponse(
+        job.result_path,
+        media_type=MEDIA_TYPES[job.kind],
+        filename=f"{job.kind}-{job.id}.{extension}",
+    )
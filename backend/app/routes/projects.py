@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, or_, update
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, utils
+from typing import List, Optional
+from .. import counters, models, outbox, schemas, sync, utils
 from ..database import get_db
+from .workspaces import MANAGER_ROLES, require_role
 
 router = APIRouter(
     prefix="/projects",
@@ -11,41 +13,101 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Project)
-async def create_project(
+def create_project(
     project: schemas.ProjectCreate, 
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    if project.workspace_id:
+        require_role(db, project.workspace_id, current_user.id, MANAGER_ROLES)
+    
     db_project = models.Project(
         id=utils.generate_id(),
         name=project.name,
         description=project.description,
         color=project.color,
-        user_id=current_user.id
+        change_seq=sync.next_seq(db, current_user.id),
+        user_id=current_user.id,
+        workspace_id=project.workspace_id
     )
     
     db.add(db_project)
+    outbox.record(db, current_user.id, "project.created", outbox.project_data(db_project))
     db.commit()
     db.refresh(db_project)
     
     return db_project
 
 @router.get("/", response_model=List[schemas.Project])
-async def get_projects(
+def get_projects(
     skip: int = 0, 
     limit: int = 100,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    selected = utils.parse_fields(fields, models.Project, schemas.Project)
+    if selected:
+        rows = db.query(*[getattr(models.Project, f) for f in selected]).filter(
+            models.Project.user_id == current_user.id
+        ).offset(skip).limit(limit).all()
+        return utils.sparse_response(rows, selected)
+    
     projects = db.query(models.Project).filter(
         models.Project.user_id == current_user.id
     ).offset(skip).limit(limit).all()
     
     return projects
 
+@router.post("/counters/recompute")
+def recompute_counters(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    updated = counters.recompute_project_counters(db, current_user.id)
+    db.commit()
+    
+    return {"updated": updated}
+
+@router.post("/archive")
+def archive_projects(
+    request: schemas.ProjectBulkArchive,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    if not request.project_ids and request.inactive_since is None:
+        raise HTTPException(status_code=400, detail="Specify project_ids or inactive_since")
+    
+    criteria = [
+        models.Project.user_id == current_user.id,
+        models.Project.is_archived.is_distinct_from(request.is_archived)
+    ]
+    if request.project_ids:
+        criteria.append(models.Project.id.in_(request.project_ids))
+    if request.inactive_since is not None:
+        criteria.append(or_(
+            models.Project.last_entry_at == None,
+            models.Project.last_entry_at < request.inactive_since
+        ))
+    
+    updated = db.scalars(
+        update(models.Project).where(*criteria).values(
+            is_archived=request.is_archived,
+            change_seq=sync.next_seq(db, current_user.id)
+        ).returning(models.Project.id),
+        execution_options={"synchronize_session": False}
+    ).all()
+    if updated:
+        outbox.record(db, current_user.id, "project.archived" if request.is_archived else "project.unarchived", {
+            "project_ids": updated,
+        })
+    db.commit()
+    
+    return {"updated": len(updated)}
+
 @router.get("/{project_id}", response_model=schemas.Project)
-async def get_project(
-    project_id: str,
+def get_project(
+    project_id: schemas.EntityId,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
@@ -60,8 +122,8 @@ async def get_project(
     return project
 
 @router.put("/{project_id}", response_model=schemas.Project)
-async def update_project(
-    project_id: str,
+def update_project(
+    project_id: schemas.EntityId,
     project_update: schemas.ProjectUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
@@ -77,6 +139,8 @@ async def update_project(
     update_data = project_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_project, key, value)
+    db_project.change_seq = sync.next_seq(db, current_user.id)
+    outbox.record(db, current_user.id, "project.updated", outbox.project_data(db_project))
     
     db.commit()
     db.refresh(db_project)
@@ -84,8 +148,9 @@ async def update_project(
     return db_project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_project(
-    project_id: str,
+def delete_project(
+    project_id: schemas.EntityId,
+    reassign_to: Optional[schemas.EntityId] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
@@ -97,6 +162,30 @@ async def delete_project(
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    target = None
+    if reassign_to:
+        target = db.query(models.Project.id).filter(
+            models.Project.id == reassign_to,
+            models.Project.user_id == current_user.id
+        ).scalar()
+        if target is None or target == db_project.id:
+            raise HTTPException(status_code=400, detail="Invalid project to reassign entries to")
+    
+    seq = sync.next_seq(db, current_user.id)
+    entries = models.TimeEntry
+    if target:
+        moved = db.query(
+            func.count(entries.id),
+            func.coalesce(func.sum(entries.duration), 0),
+            func.max(entries.start_time)
+        ).filter(entries.project_id == db_project.id).one()
+        counters.entries_moved_in(db, target, *moved, seq=seq, user_id=current_user.id)
+    
+    # One UPDATE moves or detaches every entry; entries outlive their project
+    # and the change must reach syncing clients, which ON DELETE SET NULL alone would not.
+    sync.update_entries(db, [entries.project_id == db_project.id], {entries.project_id: target})
+    sync.record_deletion(db, current_user.id, "project", db_project.id, seq)
+    outbox.record(db, current_user.id, "project.deleted", {"id": db_project.id, "reassigned_to": target})
     db.delete(db_project)
     db.commit()
     
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from .. import models, schemas, utils
+from ..database import get_db
+from .workspaces import MANAGER_ROLES
+
+router = APIRouter(
+    prefix="/rates",
+    tags=["rates"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+# A rate created without an effective date applies to all past entries too.
+ALWAYS = datetime(1970, 1, 1)
+
+def require_project_manager(db: Session, project_id: str, user_id: str):
+    """Project and member rates are set by the project's owner or its workspace managers."""
+    project = db.get(models.Project, project_id)
+    if project is not None and project.user_id != user_id and project.workspace_id:
+        membership = db.get(models.WorkspaceMember, (project.workspace_id, user_id))
+        if membership is not None and membership.role in MANAGER_ROLES:
+            return project
+        project = None
+
+    if project is None or project.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return project
+
+@router.get("/", response_model=List[schemas.Rate])
+def get_rates(
+    project_id: Optional[schemas.EntityId] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """The rates of a project, or without one the caller's own default and member rates."""
+    query = db.query(models.Rate)
+    if project_id:
+        require_project_manager(db, project_id, current_user.id)
+        query = query.filter(models.Rate.project_id == project_id)
+    else:
+        query = query.filter(models.Rate.user_id == current_user.id)
+
+    return query.order_by(models.Rate.project_id, models.Rate.user_id, models.Rate.effective_from).all()
+
+@router.post("/", response_model=schemas.Rate)
+def create_rate(
+    rate: schemas.RateCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    user_id = rate.user_id
+    if rate.project_id:
+        require_project_manager(db, rate.project_id, current_user.id)
+        if user_id and db.get(models.User, user_id) is None:
+            raise HTTPException(status_code=404, detail="User not found")
+    elif user_id and user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Users set their own default rate")
+    else:
+        user_id = current_user.id
+
+    db_rate = models.Rate(
+        id=utils.generate_id(),
+        hourly_rate=rate.hourly_rate,
+        effective_from=rate.effective_from or ALWAYS,
+        user_id=user_id,
+        project_id=rate.project_id,
+        created_by=current_user.id
+    )
+    db.add(db_rate)
+    db.commit()
+    db.refresh(db_rate)
+
+    return db_rate
+
+@router.delete("/{rate_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_rate(
+    rate_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    db_rate = db.get(models.Rate, rate_id)
+    if db_rate is None or (db_rate.project_id is None and db_rate.user_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Rate not found")
+
+    if db_rate.project_id:
+        require_project_manager(db, db_rate.project_id, current_user.id)
+
+    db.delete(db_rate)
+    db.commit()
+
+    return None
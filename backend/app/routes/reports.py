@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import List, Dict, Any
+from sqlalchemy import case, cast, func, and_, or_, select, text, true, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from .. import models, schemas, utils
-from ..database import get_db
+from .. import archive, earnings, formats, models, overlaps, schemas, singleflight, utils
+from ..database import SessionLocal, get_db
 
 router = APIRouter(
     prefix="/reports",
@@ -12,13 +19,8 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}},
 )
 
-@router.post("/time-entries", response_model=List[schemas.TimeEntry])
-async def get_filtered_time_entries(
-    filters: schemas.TimeEntryFilters,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(utils.get_current_user)
-):
-    query = db.query(models.TimeEntry).filter(models.TimeEntry.user_id == current_user.id)
+def _apply_filters(query, filters: schemas.TimeEntryFilters, user_id: str):
+    query = query.filter(models.TimeEntry.user_id == user_id)
     
     if filters.start_date:
         query = query.filter(models.TimeEntry.start_time >= filters.start_date)
@@ -33,37 +35,174 @@ async def get_filtered_time_entries(
         search = f"%{filters.search_term}%"
         query = query.filter(models.TimeEntry.description.ilike(search))
     
-    if filters.tags and len(filters.tags) > 0:
-        entries = query.all()
-        filtered_entries = []
-        for entry in entries:
-            if any(tag in entry.tags for tag in filters.tags):
-                filtered_entries.append(entry)
-        return filtered_entries
+    return query
+
+def _has_tags(entry, filters: schemas.TimeEntryFilters):
+    return not filters.tags or any(tag in entry.tags for tag in filters.tags)
+
+def _filter_tags(entries, filters: schemas.TimeEntryFilters):
+    if not filters.tags:
+        return entries
+    return [entry for entry in entries if _has_tags(entry, filters)]
+
+def _archived_entries(user_id: str, filters: schemas.TimeEntryFilters, columns=None):
+    return archive.scan(
+        user_id,
+        filters.start_date,
+        filters.end_date,
+        columns,
+        project_id=filters.project_id,
+        search_term=filters.search_term,
+    )
+
+def _project_names(db: Session, user_id: str) -> Dict[str, str]:
+    """Names of the projects the user can track time on: their own and their workspaces'."""
+    workspace_ids = select(models.WorkspaceMember.workspace_id).where(models.WorkspaceMember.user_id == user_id)
+    return {p.id: p.name for p in db.query(models.Project.id, models.Project.name).filter(
+        or_(models.Project.user_id == user_id, models.Project.workspace_id.in_(workspace_ids))
+    )}
+
+def _with_session(build, *args):
+    # Coalesced reports run on a worker thread, outside the request's session.
+    db = SessionLocal()
+    try:
+        return build(db, *args)
+    finally:
+        db.close()
+
+async def _coalesced(db: Session, name: str, user_id: str, params: dict, build, *args):
+    """Run build(db, user_id, *args) once for concurrent identical requests."""
+    # Hand the request's connection back to the pool while waiting on the
+    # worker; the close rolls back on the connection, so not on the event loop.
+    await run_in_threadpool(db.close)
+    key = (name, user_id, json.dumps(params, sort_keys=True, default=str))
+    return await singleflight.flights.do(key, _with_session, build, user_id, *args)
+
+def build_time_entries(
+    db: Session,
+    user_id: str,
+    filters: schemas.TimeEntryFilters,
+    fields: Optional[str]
+):
+    selected = utils.parse_fields(fields, models.TimeEntry, schemas.TimeEntry)
+    columns = None
+    if selected:
+        columns = list(selected)
+        for required in ("start_time", "tags" if filters.tags else None):
+            if required and required not in columns:
+                columns.append(required)
+        query = db.query(*[getattr(models.TimeEntry, f) for f in columns])
+    else:
+        query = db.query(models.TimeEntry)
     
+    query = _apply_filters(query, filters, user_id)
     entries = query.order_by(models.TimeEntry.start_time.desc()).all()
+    
+    archived = _archived_entries(user_id, filters, columns and [c for c in columns if c in archive.COLUMNS])
+    if archived:
+        entries = sorted(entries + archived, key=lambda e: e.start_time, reverse=True)
+    
+    entries = _filter_tags(entries, filters)
+    
+    if selected:
+        return utils.sparse_response(entries, selected)
+    
     return entries
 
-@router.get("/summary/daily", response_model=List[Dict[str, Any]])
-async def get_daily_summary(
-    start_date: datetime = None,
-    end_date: datetime = None,
+def stream_time_entries(user_id: str, filters: schemas.TimeEntryFilters, columns: List[str]):
+    """Yield matching entries newest first, a batch at a time, for the binary formats."""
+    # The request's session is closed before a streaming body is sent.
+    db = SessionLocal()
+    try:
+        query = db.query(*[getattr(models.TimeEntry, c) for c in columns])
+        query = _apply_filters(query, filters, user_id).order_by(models.TimeEntry.start_time.desc())
+        for row in query.yield_per(1000):
+            if _has_tags(row, filters):
+                yield row
+    finally:
+        db.close()
+    
+    # Archived entries are older than anything left in the table.
+    for entry in archive.iter_scan(
+        user_id,
+        filters.start_date,
+        filters.end_date,
+        [c for c in columns if c in archive.COLUMNS],
+        project_id=filters.project_id,
+        search_term=filters.search_term,
+        newest_first=True,
+    ):
+        if _has_tags(entry, filters):
+            yield entry
+
+@router.post("/time-entries", response_model=List[schemas.TimeEntry])
+async def get_filtered_time_entries(
+    filters: schemas.TimeEntryFilters,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    format = formats.negotiate(accept)
+    if format != "json":
+        # Binary formats stream straight from the cursor instead of being
+        # built once and shared, so nothing holds the whole result.
+        selected = utils.parse_fields(fields, models.TimeEntry, schemas.TimeEntry) or formats.entry_fields()
+        columns = selected + (["tags"] if filters.tags and "tags" not in selected else [])
+        await run_in_threadpool(db.close)
+        return StreamingResponse(
+            formats.encode(format, stream_time_entries(current_user.id, filters, columns), models.TimeEntry, selected),
+            media_type=formats.media_type(format)
+        )
+    
+    params = filters.model_dump(mode="json")
+    params["tags"] = sorted(set(filters.tags)) if filters.tags else None
+    params["fields"] = sorted(set(fields.split(","))) if fields else None
+    return await _coalesced(db, "time-entries", current_user.id, params, build_time_entries, filters, fields)
+
+@router.get("/project/{project_id}/summary", response_model=Dict[str, Any])
+def get_project_activity_summary(
+    project_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    project = db.query(
+        models.Project.id,
+        models.Project.name,
+        models.Project.total_duration,
+        models.Project.entry_count,
+        models.Project.last_entry_at,
+    ).filter(
+        models.Project.id == project_id,
+        models.Project.user_id == current_user.id
+    ).first()
+    
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return {
+        "project_id": project.id,
+        "project_name": project.name,
+        "total_duration": project.total_duration,
+        "entry_count": project.entry_count,
+        "last_entry_at": project.last_entry_at,
+    }
+
+def build_daily_summary(db: Session, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]):
     if not end_date:
         end_date = datetime.utcnow()
     if not start_date:
         start_date = end_date - timedelta(days=7)
     
     entries = db.query(models.TimeEntry).filter(
-        models.TimeEntry.user_id == current_user.id,
+        models.TimeEntry.user_id == user_id,
         models.TimeEntry.start_time >= start_date,
         models.TimeEntry.start_time <= end_date,
         models.TimeEntry.duration != None  # Only completed entries
-    ).all()
+    ).all() + archive.scan(user_id, start_date, end_date, ("duration",))
     
     daily_summary = {}
+    daily_intervals = {}
     for entry in entries:
         day = entry.start_time.date().isoformat()
         if day not in daily_summary:
@@ -72,37 +211,45 @@ async def get_daily_summary(
                 "total_duration": 0,
                 "entry_count": 0
             }
+            daily_intervals[day] = []
         
         daily_summary[day]["total_duration"] += entry.duration
         daily_summary[day]["entry_count"] += 1
+        daily_intervals[day].append(overlaps.entry_interval(entry))
+    
+    # Overlapping entries are counted once in covered_duration.
+    for day, intervals in daily_intervals.items():
+        daily_summary[day]["covered_duration"] = overlaps.merged_duration(intervals)
     
     result = list(daily_summary.values())
     result.sort(key=lambda x: x["date"])
     
     return result
 
-@router.get("/summary/project", response_model=List[Dict[str, Any]])
-async def get_project_summary(
+@router.get("/summary/daily", response_model=List[Dict[str, Any]])
+async def get_daily_summary(
     start_date: datetime = None,
     end_date: datetime = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    params = {"start_date": start_date, "end_date": end_date}
+    return await _coalesced(db, "summary/daily", current_user.id, params, build_daily_summary, start_date, end_date)
+
+def build_project_summary(db: Session, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]):
     if not end_date:
         end_date = datetime.utcnow()
     if not start_date:
         start_date = end_date - timedelta(days=30)
     
     entries = db.query(models.TimeEntry).filter(
-        models.TimeEntry.user_id == current_user.id,
+        models.TimeEntry.user_id == user_id,
         models.TimeEntry.start_time >= start_date,
         models.TimeEntry.start_time <= end_date,
         models.TimeEntry.duration != None  # Only completed entries
-    ).all()
+    ).all() + archive.scan(user_id, start_date, end_date, ("duration", "project_id"))
     
-    projects = {p.id: p.name for p in db.query(models.Project).filter(
-        models.Project.user_id == current_user.id
-    ).all()}
+    projects = _project_names(db, user_id)
     
     project_summary = {}
     for entry in entries:
@@ -125,24 +272,28 @@ async def get_project_summary(
     
     return result
 
-@router.get("/summary/tags", response_model=List[Dict[str, Any]])
-async def get_tags_summary(
+@router.get("/summary/project", response_model=List[Dict[str, Any]])
+async def get_project_summary(
     start_date: datetime = None,
     end_date: datetime = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    params = {"start_date": start_date, "end_date": end_date}
+    return await _coalesced(db, "summary/project", current_user.id, params, build_project_summary, start_date, end_date)
+
+def build_tags_summary(db: Session, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]):
     if not end_date:
         end_date = datetime.utcnow()
     if not start_date:
         start_date = end_date - timedelta(days=30)
     
     entries = db.query(models.TimeEntry).filter(
-        models.TimeEntry.user_id == current_user.id,
+        models.TimeEntry.user_id == user_id,
         models.TimeEntry.start_time >= start_date,
         models.TimeEntry.start_time <= end_date,
         models.TimeEntry.duration != None  # Only completed entries
-    ).all()
+    ).all() + archive.scan(user_id, start_date, end_date, ("duration", "tags"))
     
     tag_summary = {}
     for entry in entries:
@@ -161,3 +312,358 @@ async def get_tags_summary(
     result.sort(key=lambda x: x["total_duration"], reverse=True)
     
     return result
+
+@router.get("/summary/tags", response_model=List[Dict[str, Any]])
+async def get_tags_summary(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    params = {"start_date": start_date, "end_date": end_date}
+    return await _coalesced(db, "summary/tags", current_user.id, params, build_tags_summary, start_date, end_date)
+
+def build_earnings(db: Session, user_id: str, start_date: datetime, end_date: datetime, group_by: List[str]):
+    return earnings.build_earnings(db, [user_id], start_date, end_date, group_by)
+
+@router.get("/earnings", response_model=Dict[str, Any])
+async def get_earnings(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    group_by: List[schemas.EarningsDimension] = Query(["project"]),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """Tracked time and billable amounts at the applicable hourly rates."""
+    if not end_date:
+        end_date = datetime.utcnow()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    
+    params = {"start_date": start_date, "end_date": end_date, "group_by": group_by}
+    return await _coalesced(db, "earnings", current_user.id, params, build_earnings, start_date, end_date, group_by)
+
+# Entries are clipped to the range, shifted to the caller's clock, and cut into
+# hour pieces by generate_series; one pass then totals both days and weekday/hour cells.
+TIMELINE_SQL = text("""
+WITH clipped AS (
+    SELECT
+        GREATEST(start_time, :start) + :offset AS start_at,
+        LEAST(COALESCE(end_time, :now), :end) + :offset AS end_at
+    FROM time_entries
+    WHERE user_id = :user_id
+      AND start_time < :end
+      AND COALESCE(end_time, :now) > :start
+), pieces AS (
+    SELECT
+        CAST(hour AS date) AS day,
+        CAST(EXTRACT(ISODOW FROM hour) AS integer) - 1 AS weekday,
+        CAST(EXTRACT(HOUR FROM hour) AS integer) AS hour_of_day,
+        EXTRACT(EPOCH FROM LEAST(end_at, hour + INTERVAL '1 hour') - GREATEST(start_at, hour)) AS seconds
+    FROM clipped
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('hour', start_at), end_at - INTERVAL '1 microsecond', INTERVAL '1 hour'
+    ) AS hour
+    WHERE end_at > start_at
+)
+SELECT day, weekday, hour_of_day, SUM(seconds) AS seconds, GROUPING(day) AS by_hour
+FROM pieces
+GROUP BY GROUPING SETS ((day), (weekday, hour_of_day))
+""")
+
+def _hour_pieces(start: datetime, end: datetime):
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        next_hour = hour + timedelta(hours=1)
+        yield hour, (min(end, next_hour) - max(start, hour)).total_seconds()
+        hour = next_hour
+
+@router.get("/timeline", response_model=Dict[str, Any])
+def get_timeline(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    utc_offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """Per-day totals and a weekday x hour heatmap, splitting entries at boundaries.
+    
+    utc_offset is the caller's offset from UTC in minutes; days and hours are local to it.
+    """
+    if not end_date:
+        end_date = datetime.utcnow()
+    if not start_date:
+        start_date = end_date - timedelta(days=7)
+    offset = timedelta(minutes=utc_offset)
+    
+    days = {}
+    heatmap = [[0.0] * 24 for _ in range(7)]
+    now = datetime.utcnow()
+    spans = []
+    if db.bind.dialect.name == "postgresql":
+        rows = db.execute(TIMELINE_SQL, {
+            "user_id": current_user.id,
+            "start": start_date,
+            "end": end_date,
+            "now": now,
+            "offset": offset,
+        })
+        for row in rows:
+            if row.by_hour:
+                heatmap[row.weekday][row.hour_of_day] += float(row.seconds)
+            else:
+                days[row.day.isoformat()] = float(row.seconds)
+    else:
+        # SQLite has no generate_series; live entries are split like archived ones.
+        rows = db.query(models.TimeEntry.start_time, models.TimeEntry.end_time).filter(
+            models.TimeEntry.user_id == current_user.id,
+            models.TimeEntry.start_time < end_date,
+            func.coalesce(models.TimeEntry.end_time, now) > start_date
+        )
+        spans += [(start_time, end_time or now) for start_time, end_time in rows]
+    
+    # Archived entries are rare in a timeline range and are split here instead.
+    for entry in archive.scan(current_user.id, start_date - timedelta(days=1), end_date, ("duration",)):
+        spans.append((entry.start_time, entry.start_time + timedelta(seconds=entry.duration or 0)))
+    
+    for start, end in spans:
+        start, end = max(start, start_date), min(end, end_date)
+        for hour, seconds in _hour_pieces(start + offset, end + offset):
+            heatmap[hour.weekday()][hour.hour] += seconds
+            day = hour.date().isoformat()
+            days[day] = days.get(day, 0) + seconds
+    
+    return {
+        "days": [{"date": day, "total_duration": days[day]} for day in sorted(days)],
+        "heatmap": heatmap,
+    }
+
+def _dimension_keys(dimension: str, entry):
+    if dimension == "day":
+        return [entry.start_time.date().isoformat()]
+    if dimension == "week":
+        week_start = entry.start_time.date() - timedelta(days=entry.start_time.weekday())
+        return [week_start.isoformat()]
+    if dimension == "month":
+        return [entry.start_time.strftime("%Y-%m")]
+    if dimension == "project":
+        return [entry.project_id]
+    return entry.tags or [None]
+
+def _grouping_sets(group_by: List[str]):
+    # ROLLUP over the requested order plus each single-dimension breakdown.
+    sets = [tuple(group_by[:i]) for i in range(len(group_by), 0, -1)]
+    sets += [(dimension,) for dimension in group_by[1:]]
+    return sets
+
+def _accumulate(entries, group_by: List[str], groups: dict, total: dict):
+    for entry in entries:
+        total["total_duration"] += entry.duration
+        total["entry_count"] += 1
+        
+        keys = {dimension: _dimension_keys(dimension, entry) for dimension in group_by}
+        for grouping, buckets in groups.items():
+            combinations = [()]
+            for dimension in grouping:
+                combinations = [c + (k,) for c in combinations for k in keys[dimension]]
+            for combination in combinations:
+                bucket = buckets.get(combination)
+                if bucket is None:
+                    bucket = buckets[combination] = {"total_duration": 0, "entry_count": 0}
+                bucket["total_duration"] += entry.duration
+                bucket["entry_count"] += 1
+
+def _aggregate_in_database(db: Session, user_id: str, filters: schemas.TimeEntryFilters, group_by: List[str], groups: dict, total: dict):
+    """Total every grouping set in one GROUP BY GROUPING SETS scan; returns the covered intervals."""
+    entries = models.TimeEntry
+    query = db.query(
+        entries.start_time,
+        entries.duration,
+        entries.tags,
+        entries.project_id.label("project"),
+        func.to_char(entries.start_time, "YYYY-MM-DD").label("day"),
+        func.to_char(func.date_trunc("week", entries.start_time), "YYYY-MM-DD").label("week"),
+        func.to_char(entries.start_time, "YYYY-MM").label("month"),
+    )
+    query = _apply_filters(query, filters, user_id).filter(entries.duration != None)
+    if filters.tags:
+        query = query.filter(cast(entries.tags, JSONB).op("?|")(postgresql.array(filters.tags)))
+    live = query.subquery()
+    
+    columns = {dimension: live.c[dimension] for dimension in ("day", "week", "month", "project")}
+    source = live
+    # Entries fan out to one row per tag (one untagged row without tags). A
+    # grouping with tag counts every row; the others count each entry's first row only.
+    first = true()
+    if "tag" in group_by:
+        tag_rows = func.jsonb_array_elements_text(cast(live.c.tags, JSONB)).table_valued(
+            "value", with_ordinality="position"
+        ).render_derived(name="tag_rows").lateral()
+        source = live.outerjoin(tag_rows, true())
+        columns["tag"] = tag_rows.c.value
+        first = func.coalesce(tag_rows.c.position, 1) == 1
+    
+    grouping_sets = [tuple_(*[columns[d] for d in grouping]) for grouping in groups] + [tuple_()]
+    rows = db.execute(select(
+        *[columns[d].label(d) for d in group_by],
+        *[func.grouping(columns[d]).label(f"without_{d}") for d in group_by],
+        func.sum(live.c.duration).label("row_duration"),
+        func.count().label("row_count"),
+        func.sum(live.c.duration).filter(first).label("entry_duration"),
+        func.count().filter(first).label("entry_count"),
+    ).select_from(source).group_by(func.grouping_sets(*grouping_sets))).all()
+    
+    for row in rows:
+        grouping = tuple(d for d in group_by if not row._mapping[f"without_{d}"])
+        if "tag" in grouping:
+            bucket = {"total_duration": row.row_duration, "entry_count": row.row_count}
+        else:
+            bucket = {"total_duration": row.entry_duration or 0, "entry_count": row.entry_count}
+        if grouping:
+            groups[grouping][tuple(row._mapping[d] for d in grouping)] = bucket
+        else:
+            total.update(bucket)
+    
+    # Merge overlapping entries into islands in SQL: an entry opens a new
+    # island when it starts after every earlier one has ended.
+    ends = select(
+        live.c.start_time,
+        (live.c.start_time + func.make_interval(0, 0, 0, 0, 0, 0, live.c.duration)).label("end_time"),
+    ).subquery()
+    order = (ends.c.start_time, ends.c.end_time)
+    reach = func.max(ends.c.end_time).over(order_by=order, rows=(None, -1))
+    opened = select(
+        ends.c.start_time,
+        ends.c.end_time,
+        case((or_(reach == None, ends.c.start_time > reach), 1), else_=0).label("opens"),
+    ).subquery()
+    numbered = select(
+        opened.c.start_time,
+        opened.c.end_time,
+        func.sum(opened.c.opens).over(order_by=(opened.c.start_time, opened.c.end_time), rows=(None, 0)).label("island"),
+    ).subquery()
+    return db.execute(
+        select(func.min(numbered.c.start_time), func.max(numbered.c.end_time)).group_by(numbered.c.island)
+    ).all()
+
+def build_report(db: Session, user_id: str, report: schemas.ReportRequest):
+    group_by = list(dict.fromkeys(report.group_by))
+    grouping_sets = _grouping_sets(group_by)
+    
+    total = {"total_duration": 0, "entry_count": 0}
+    groups = {grouping: {} for grouping in grouping_sets}
+    
+    archived = _filter_tags(_archived_entries(
+        user_id, report.filters, ("duration", "project_id", "tags")
+    ), report.filters)
+    
+    if db.bind.dialect.name == "postgresql":
+        intervals = _aggregate_in_database(db, user_id, report.filters, group_by, groups, total)
+    else:
+        # SQLite has no GROUPING SETS; the live rows are totalled with the archived ones.
+        query = db.query(
+            models.TimeEntry.start_time,
+            models.TimeEntry.duration,
+            models.TimeEntry.project_id,
+            models.TimeEntry.tags,
+        )
+        query = _apply_filters(query, report.filters, user_id).filter(
+            models.TimeEntry.duration != None  # Only completed entries
+        )
+        live = _filter_tags(query.all(), report.filters)
+        _accumulate(live, group_by, groups, total)
+        intervals = [overlaps.entry_interval(entry) for entry in live]
+    
+    # Archived segments are columnar files outside the database.
+    _accumulate(archived, group_by, groups, total)
+    total["covered_duration"] = overlaps.merged_duration(
+        intervals + [overlaps.entry_interval(entry) for entry in archived]
+    )
+    
+    project_names = {}
+    if "project" in group_by:
+        project_names = _project_names(db, user_id)
+    
+    result_groups = []
+    for grouping, buckets in groups.items():
+        rows = []
+        for combination, bucket in buckets.items():
+            row = dict(zip(grouping, combination))
+            if "project" in row:
+                row["project_name"] = project_names.get(row["project"], "No Project")
+            row.update(bucket)
+            rows.append(row)
+        rows.sort(key=lambda x: tuple("" if x[d] is None else x[d] for d in grouping))
+        result_groups.append({"dimensions": list(grouping), "rows": rows})
+    
+    return {
+        "group_by": group_by,
+        "total": total,
+        "groups": result_groups,
+    }
+
+@router.post("/generate", response_model=Dict[str, Any])
+def generate_report(
+    report: schemas.ReportRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return build_report(db, current_user.id, report)
+
+EXPORT_COLUMNS = ["id", "description", "project_id", "start_time", "end_time", "duration", "tags"]
+
+def export_rows(user_id: str, filters: schemas.TimeEntryFilters):
+    # Archived entries are older than anything left in the table.
+    yield from _archived_entries(user_id, filters, EXPORT_COLUMNS)
+    
+    # The request's session is closed before a streaming body is sent.
+    db = SessionLocal()
+    try:
+        query = db.query(*[getattr(models.TimeEntry, c) for c in EXPORT_COLUMNS])
+        query = _apply_filters(query, filters, user_id).order_by(models.TimeEntry.start_time)
+        for row in query.yield_per(1000):
+            yield row
+    finally:
+        db.close()
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for i, row in enumerate(rows):
+        writer.writerow([
+            ";".join(row.tags or []) if column == "tags" else getattr(row, column)
+            for column in EXPORT_COLUMNS
+        ])
+        if i % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@router.get("/export/{format}")
+async def export_time_entries(
+    format: str,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    project_id: Optional[schemas.EntityId] = None,
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    if format not in ("csv", "arrow", "msgpack"):
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    filters = schemas.TimeEntryFilters(start_date=start_date, end_date=end_date, project_id=project_id)
+    
+    if format != "csv":
+        formats.require(format)
+        return StreamingResponse(
+            formats.encode(format, export_rows(current_user.id, filters), models.TimeEntry, EXPORT_COLUMNS),
+            media_type=formats.media_type(format),
+            headers={"Content-Disposition": f'attachment; filename="time-entries.{formats.FILE_EXTENSIONS[format]}"'},
+        )
+    
+    return StreamingResponse(
+        csv_stream(export_rows(current_user.id, filters)),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="time-entries.csv"'},
+    )
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from .. import events, models, schemas, sync, utils
+from ..database import get_db
+from .timer import can_use_project, find_idempotent_entry, start_entry, stop_entry
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+def _apply_event(db: Session, user_id: str, event: schemas.SyncEvent) -> schemas.SyncEventResult:
+    result = schemas.SyncEventResult(client_event_id=event.client_event_id, status="applied")
+
+    if event.type == "start" and not can_use_project(db, event.project_id, user_id):
+        result.status = "project_not_found"
+        return result
+
+    if event.type == "start":
+        timer_data = schemas.TimerStart(
+            description=event.description,
+            project_id=event.project_id,
+            tags=event.tags
+        )
+        entry = start_entry(db, user_id, timer_data, event.at, event.client_event_id)
+        if entry is None:
+            entry = find_idempotent_entry(db, user_id, event.client_event_id)
+            result.status = "duplicate" if entry is not None else "conflict"
+    else:
+        entry = stop_entry(db, user_id, event.at)
+        if entry is None:
+            result.status = "no_running_timer"
+
+    if entry is not None:
+        result.entry_id = entry.id
+    db.commit()
+    return result
+
+HEARTBEAT_SECONDS = 15
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """Server-sent events for the caller; clients fetch /sync when one arrives."""
+    user_id = current_user.id
+    queue = events.bus.subscribe(user_id)
+    
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            events.bus.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/", response_model=schemas.SyncResponse)
+def get_changes(
+    since: int = 0,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return sync.changes_since(db, current_user.id, since)
+
+@router.post("/", response_model=schemas.SyncResponse)
+def push_events(
+    request: schemas.SyncRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    # Events are applied in client order, each in its own transaction, so one
+    # conflicting event does not discard the rest of an offline batch.
+    results = [_apply_event(db, current_user.id, event) for event in request.events]
+    
+    changes = sync.changes_since(db, current_user.id, request.since)
+    changes["results"] = results
+    return changes
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+from .. import models, outbox, schemas, tags, utils
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/tags",
+    tags=["tags"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+@router.get("/", response_model=List[schemas.Tag])
+def get_tags(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return db.query(models.Tag).filter(
+        models.Tag.user_id == current_user.id,
+        models.Tag.usage_count > 0
+    ).order_by(models.Tag.normalized, models.Tag.name).all()
+
+@router.get("/autocomplete", response_model=List[schemas.Tag])
+def autocomplete_tags(
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return tags.autocomplete(db, current_user.id, q, limit)
+
+@router.post("/rename", response_model=schemas.TagRewriteResult)
+def rename_tag(
+    rename: schemas.TagRename,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    exists = db.query(models.Tag.id).filter(
+        models.Tag.user_id == current_user.id,
+        models.Tag.name == rename.name
+    ).first()
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    
+    # Renaming onto an existing tag merges the two.
+    updated = tags.merge_tags(db, current_user.id, [rename.name], rename.new_name)
+    outbox.record(db, current_user.id, "tags.merged", {"sources": [rename.name], "target": rename.new_name})
+    db.commit()
+    
+    return {"updated_entries": updated}
+
+@router.post("/merge", response_model=schemas.TagRewriteResult)
+def merge_tags(
+    merge: schemas.TagMerge,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    updated = tags.merge_tags(db, current_user.id, merge.sources, merge.target)
+    outbox.record(db, current_user.id, "tags.merged", {"sources": merge.sources, "target": merge.target})
+    db.commit()
+    
+    return {"updated_entries": updated}
+
+@router.post("/rebuild", response_model=List[schemas.Tag])
+def rebuild_tags(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    tags.rebuild_tag_catalog(db, current_user.id)
+    db.commit()
+    
+    return get_tags(db, current_user)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from .. import models, schemas, utils
+from .. import counters, formats, models, outbox, overlaps, schemas, sql, suggestions, sync, tags, utils
 from ..database import get_db
 
 router = APIRouter(
@@ -11,47 +14,222 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}},
 )
 
-@router.post("/start", response_model=schemas.TimeEntry)
-async def start_timer(
+def _running_timer_exists(user_id: str):
+    return exists().where(
+        models.TimeEntry.user_id == user_id,
+        models.TimeEntry.end_time == None
+    )
+
+def _idempotency_key_used(user_id: str, idempotency_key: str):
+    return exists().where(
+        models.TimeEntry.user_id == user_id,
+        models.TimeEntry.idempotency_key == idempotency_key
+    )
+
+def _overlap_guard(user_id: str, start_time: datetime):
+    # Only users who opted into prevent_overlaps are refused overlapping starts.
+    return select(models.User.id).where(
+        models.User.id == user_id,
+        models.User.prevent_overlaps == True,
+        exists().where(
+            models.TimeEntry.user_id == user_id,
+            sql.periods_overlap(
+                models.TimeEntry.start_time, models.TimeEntry.end_time,
+                literal(start_time, models.TimeEntry.start_time.type), None
+            )
+        )
+    ).exists()
+
+# Unique indexes whose violation means "lost the race to start", not bad input.
+# Partitions name their copies <partition>_running_timer / <partition>_idempotency_key.
+START_RACE_INDEXES = ("running_timer", "idempotency_key")
+
+def _lost_start_race(error: IntegrityError) -> bool:
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return (diag.constraint_name or "").endswith(START_RACE_INDEXES)
+    # SQLite reports the columns instead of the index name.
+    return str(error.orig) in (
+        "UNIQUE constraint failed: time_entries.user_id",
+        "UNIQUE constraint failed: time_entries.user_id, time_entries.idempotency_key",
+    )
+
+def can_use_project(db: Session, project_id: Optional[str], user_id: str) -> bool:
+    """Entries may go on the user's own projects and those of workspaces they belong to."""
+    if not project_id:
+        return True
+    project = db.get(models.Project, project_id)
+    if project is None:
+        return False
+    if project.user_id == user_id:
+        return True
+    return project.workspace_id is not None and db.get(
+        models.WorkspaceMember, (project.workspace_id, user_id)
+    ) is not None
+
+def require_project(db: Session, project_id: Optional[str], user_id: str):
+    if not can_use_project(db, project_id, user_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+def start_conflict_detail(db: Session, user_id: str) -> str:
+    if db.query(_running_timer_exists(user_id)).scalar():
+        return "You already have a running timer"
+    return "Time entry would overlap an existing entry"
+
+def start_entry(
+    db: Session,
+    user_id: str,
     timer_data: schemas.TimerStart,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(utils.get_current_user)
+    start_time: datetime,
+    idempotency_key: Optional[str] = None
 ):
-    running_timer = db.query(models.TimeEntry).filter(
-        models.TimeEntry.user_id == current_user.id,
-        models.TimeEntry.end_time == None
+    """Insert a running entry unless it conflicts with another; returns None then."""
+    seq = sync.next_seq(db, user_id)
+    values = {
+        "id": utils.generate_id(),
+        "description": timer_data.description,
+        "start_time": start_time,
+        "project_id": timer_data.project_id,
+        "tags": timer_data.tags,
+        "user_id": user_id,
+        "idempotency_key": idempotency_key,
+        "change_seq": seq,
+    }
+    columns = [getattr(models.TimeEntry, key) for key in values]
+    conditions = [~_running_timer_exists(user_id), ~_overlap_guard(user_id, start_time)]
+    if idempotency_key:
+        # The unique index alone misses a replay that lands in another partition.
+        conditions.append(~_idempotency_key_used(user_id, idempotency_key))
+    source = select(*[
+        literal(value, column.type) for value, column in zip(values.values(), columns)
+    ]).where(*conditions)
+    
+    # INSERT ... SELECT ... WHERE NOT EXISTS (running timer, overlap, used key) RETURNING *
+    try:
+        time_entry = db.scalars(
+            insert(models.TimeEntry).from_select(columns, source).returning(models.TimeEntry)
+        ).first()
+    except IntegrityError as e:
+        # A concurrent start won the race for the running-timer (or idempotency) index.
+        db.rollback()
+        if _lost_start_race(e):
+            return None
+        raise
+    
+    if time_entry is not None:
+        counters.entry_added(db, time_entry, seq)
+        tags.tags_added(db, user_id, time_entry.tags, start_time)
+        outbox.record(db, user_id, "time_entry.started", outbox.entry_data(time_entry))
+    return time_entry
+
+def find_idempotent_entry(db: Session, user_id: str, idempotency_key: Optional[str]):
+    if not idempotency_key:
+        return None
+    return db.query(models.TimeEntry).filter(
+        models.TimeEntry.user_id == user_id,
+        models.TimeEntry.idempotency_key == idempotency_key
+    ).first()
+
+def stop_entry(db: Session, user_id: str, end_time: datetime):
+    """Stop the running entry of a user if it started by `end_time`; else return None."""
+    seq = sync.next_seq(db, user_id)
+    
+    # UPDATE ... SET end_time, duration computed in SQL ... RETURNING *
+    running_timer = db.scalars(
+        update(models.TimeEntry).where(
+            models.TimeEntry.user_id == user_id,
+            models.TimeEntry.end_time == None,
+            models.TimeEntry.start_time <= end_time
+        ).values(
+            end_time=end_time,
+            duration=sql.seconds_between(models.TimeEntry.start_time, end_time),
+            change_seq=seq
+        ).returning(models.TimeEntry),
+        execution_options={"synchronize_session": False}
     ).first()
     
-    if running_timer:
+    if running_timer is not None:
+        counters.duration_added(db, running_timer.project_id, running_timer.duration, seq, user_id)
+        suggestions.entries_stopped(db, [running_timer])
+        outbox.record(db, user_id, "time_entry.stopped", outbox.entry_data(running_timer))
+    return running_timer
+
+def _start_now(db: Session, user_id: str, timer_data: schemas.TimerStart, idempotency_key: Optional[str]):
+    require_project(db, timer_data.project_id, user_id)
+    time_entry = start_entry(db, user_id, timer_data, datetime.utcnow(), idempotency_key)
+    
+    if time_entry is None:
+        previous = find_idempotent_entry(db, user_id, idempotency_key)
+        if previous is not None:
+            return previous
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You already have a running timer"
+            detail=start_conflict_detail(db, user_id)
         )
     
-    time_entry = models.TimeEntry(
-        id=utils.generate_id(),
-        description=timer_data.description,
-        start_time=datetime.utcnow(),
-        project_id=timer_data.project_id,
-        tags=timer_data.tags,
-        user_id=current_user.id
-    )
-    
-    db.add(time_entry)
+    result = schemas.TimeEntry.model_validate(time_entry)
     db.commit()
-    db.refresh(time_entry)
     
-    return time_entry
+    return result
+
+@router.post("/start", response_model=schemas.TimeEntry)
+def start_timer(
+    timer_data: schemas.TimerStart,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return _start_now(db, current_user.id, timer_data, idempotency_key)
+
+@router.get("/suggestions", response_model=List[schemas.Suggestion])
+def get_suggestions(
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """Previously tracked descriptions containing q, most frequently and recently used first."""
+    return suggestions.ranked(db, current_user.id, q, limit)
+
+@router.post("/resume", response_model=schemas.TimeEntry)
+def resume_timer(
+    resume: schemas.TimerResume,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    """Start a timer like an earlier entry or suggestion; by default the last stopped entry."""
+    if resume.description is not None:
+        source = suggestions.find(db, current_user.id, resume.description)
+    else:
+        query = db.query(
+            models.TimeEntry.description,
+            models.TimeEntry.project_id,
+            models.TimeEntry.tags,
+        ).filter(models.TimeEntry.user_id == current_user.id)
+        if resume.entry_id:
+            query = query.filter(models.TimeEntry.id == resume.entry_id)
+        else:
+            query = query.filter(models.TimeEntry.end_time != None).order_by(models.TimeEntry.end_time.desc())
+        row = query.first()
+        source = row._asdict() if row else None
+    
+    if source is None:
+        raise HTTPException(status_code=404, detail="Nothing to resume")
+    
+    timer_data = schemas.TimerStart(
+        description=source["description"],
+        project_id=source["project_id"],
+        tags=source["tags"] or []
+    )
+    return _start_now(db, current_user.id, timer_data, idempotency_key)
 
 @router.post("/stop", response_model=schemas.TimeEntry)
-async def stop_timer(
+def stop_timer(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
-    running_timer = db.query(models.TimeEntry).filter(
-        models.TimeEntry.user_id == current_user.id,
-        models.TimeEntry.end_time == None
-    ).first()
+    running_timer = stop_entry(db, current_user.id, datetime.utcnow())
     
     if not running_timer:
         raise HTTPException(
@@ -59,20 +237,13 @@ async def stop_timer(
             detail="No running timer found"
         )
     
-    now = datetime.utcnow()
-    running_timer.end_time = now
-    
-    start_time = running_timer.start_time
-    duration = (now - start_time).total_seconds()
-    running_timer.duration = duration
-    
+    result = schemas.TimeEntry.model_validate(running_timer)
     db.commit()
-    db.refresh(running_timer)
     
-    return running_timer
+    return result
 
 @router.get("/current", response_model=schemas.TimeEntry)
-async def get_current_timer(
+def get_current_timer(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
@@ -90,21 +261,48 @@ async def get_current_timer(
     return running_timer
 
 @router.get("/entries", response_model=List[schemas.TimeEntry])
-async def get_time_entries(
+def get_time_entries(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
+    format = formats.negotiate(accept)
+    selected = utils.parse_fields(fields, models.TimeEntry, schemas.TimeEntry)
+    if format != "json":
+        selected = selected or formats.entry_fields()
+    if selected:
+        rows = db.query(*[getattr(models.TimeEntry, f) for f in selected]).filter(
+            models.TimeEntry.user_id == current_user.id
+        ).order_by(models.TimeEntry.start_time.desc()).offset(skip).limit(limit).all()
+        if format != "json":
+            return StreamingResponse(
+                formats.encode(format, rows, models.TimeEntry, selected),
+                media_type=formats.media_type(format)
+            )
+        return utils.sparse_response(rows, selected)
+    
     entries = db.query(models.TimeEntry).filter(
         models.TimeEntry.user_id == current_user.id
     ).order_by(models.TimeEntry.start_time.desc()).offset(skip).limit(limit).all()
     
     return entries
 
+@router.get("/entries/overlaps", response_model=List[schemas.EntryOverlap])
+def get_overlapping_entries(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return overlaps.overlapping_pairs(db, current_user.id, start_date, end_date, limit)
+
 @router.get("/entries/{entry_id}", response_model=schemas.TimeEntry)
-async def get_time_entry(
-    entry_id: str,
+def get_time_entry(
+    entry_id: schemas.EntityId,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
@@ -119,8 +317,8 @@ async def get_time_entry(
     return entry
 
 @router.put("/entries/{entry_id}", response_model=schemas.TimeEntry)
-async def update_time_entry(
-    entry_id: str,
+def update_time_entry(
+    entry_id: schemas.EntityId,
     entry_update: schemas.TimeEntryUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
@@ -134,20 +332,47 @@ async def update_time_entry(
         raise HTTPException(status_code=404, detail="Time entry not found")
     
     update_data = entry_update.dict(exclude_unset=True)
+    if update_data.get("project_id") not in (None, db_entry.project_id):
+        require_project(db, update_data["project_id"], current_user.id)
+    
+    before = counters.snapshot(db_entry)
+    old_tags = list(db_entry.tags or [])
+    old_description, was_stopped = db_entry.description, db_entry.end_time is not None
+    seq = sync.next_seq(db, current_user.id)
+    
     for key, value in update_data.items():
         setattr(db_entry, key, value)
     
     if db_entry.start_time and db_entry.end_time:
+        if db_entry.end_time < db_entry.start_time:
+            raise HTTPException(status_code=400, detail="End time must not be before start time")
         db_entry.duration = (db_entry.end_time - db_entry.start_time).total_seconds()
     
+    # The sequence bump above holds the user row lock, so this check cannot race.
+    if current_user.prevent_overlaps and overlaps.conflicting_entry(
+        db, current_user.id, db_entry.start_time, db_entry.end_time, exclude_id=db_entry.id
+    ):
+        raise HTTPException(status_code=400, detail="Time entry would overlap an existing entry")
+    db_entry.change_seq = seq
+    
+    db.flush()
+    counters.entry_changed(db, before, db_entry, seq)
+    tags.tags_changed(db, current_user.id, old_tags, db_entry.tags, db_entry.start_time)
+    # Suggestions count stopped entries by description; move the count if either changed.
+    if (old_description, was_stopped) != (db_entry.description, db_entry.end_time is not None):
+        if was_stopped:
+            suggestions.entry_uncounted(db, current_user.id, old_description)
+        if db_entry.end_time is not None:
+            suggestions.entries_stopped(db, [db_entry])
+    outbox.record(db, current_user.id, "time_entry.updated", outbox.entry_data(db_entry))
     db.commit()
     db.refresh(db_entry)
     
     return db_entry
 
 @router.delete("/entries/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_time_entry(
-    entry_id: str,
+def delete_time_entry(
+    entry_id: schemas.EntityId,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(utils.get_current_user)
 ):
@@ -159,6 +384,13 @@ async def delete_time_entry(
     if db_entry is None:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
+    seq = sync.next_seq(db, current_user.id)
+    counters.entry_removed(db, db_entry, seq)
+    tags.tags_removed(db, current_user.id, db_entry.tags)
+    if db_entry.end_time is not None:
+        suggestions.entry_uncounted(db, current_user.id, db_entry.description)
+    outbox.record(db, current_user.id, "time_entry.deleted", outbox.entry_data(db_entry))
+    sync.record_deletion(db, current_user.id, "time_entry", db_entry.id, seq)
     db.delete(db_entry)
     db.commit()
     
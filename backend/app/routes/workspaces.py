@@ -0,0 +1,257 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from .. import archive, earnings, models, schemas, utils
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/workspaces",
+    tags=["workspaces"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+MANAGER_ROLES = ("owner", "manager")
+
+def require_role(db: Session, workspace_id: str, user_id: str, roles=None):
+    """Return the caller's membership, or 404 for non-members and 403 for a missing role."""
+    membership = db.query(models.WorkspaceMember).filter(
+        models.WorkspaceMember.workspace_id == workspace_id,
+        models.WorkspaceMember.user_id == user_id
+    ).first()
+    
+    if membership is None:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    
+    if roles and membership.role not in roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient workspace role")
+    
+    return membership
+
+@router.post("/", response_model=schemas.Workspace)
+def create_workspace(
+    workspace: schemas.WorkspaceCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    db_workspace = models.Workspace(
+        id=utils.generate_id(),
+        name=workspace.name,
+        owner_id=current_user.id
+    )
+    db.add(db_workspace)
+    db.add(models.WorkspaceMember(
+        workspace_id=db_workspace.id,
+        user_id=current_user.id,
+        role="owner"
+    ))
+    db.commit()
+    db.refresh(db_workspace)
+    
+    return db_workspace
+
+@router.get("/", response_model=List[schemas.Workspace])
+def get_workspaces(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    return db.query(models.Workspace).join(models.WorkspaceMember).filter(
+        models.WorkspaceMember.user_id == current_user.id
+    ).order_by(models.Workspace.name).all()
+
+@router.get("/{workspace_id}", response_model=schemas.Workspace)
+def get_workspace(
+    workspace_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id)
+    return db.get(models.Workspace, workspace_id)
+
+@router.get("/{workspace_id}/members", response_model=List[schemas.WorkspaceMember])
+def get_members(
+    workspace_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id)
+    
+    rows = db.query(
+        models.WorkspaceMember.user_id,
+        models.User.name,
+        models.User.email,
+        models.WorkspaceMember.role,
+        models.WorkspaceMember.joined_at,
+    ).join(models.User, models.User.id == models.WorkspaceMember.user_id).filter(
+        models.WorkspaceMember.workspace_id == workspace_id
+    ).order_by(models.User.name).all()
+    
+    return [row._asdict() for row in rows]
+
+@router.post("/{workspace_id}/members", response_model=schemas.WorkspaceMember)
+def add_member(
+    workspace_id: schemas.EntityId,
+    member: schemas.WorkspaceMemberCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id, MANAGER_ROLES)
+    
+    user = db.query(models.User).filter(models.User.email == member.email).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    db_member = db.get(models.WorkspaceMember, (workspace_id, user.id))
+    if db_member is None:
+        db_member = models.WorkspaceMember(workspace_id=workspace_id, user_id=user.id)
+        db.add(db_member)
+    elif db_member.role == "owner":
+        raise HTTPException(status_code=400, detail="The workspace owner's role cannot be changed")
+    db_member.role = member.role
+    
+    db.commit()
+    db.refresh(db_member)
+    
+    return {
+        "user_id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": db_member.role,
+        "joined_at": db_member.joined_at,
+    }
+
+@router.delete("/{workspace_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_member(
+    workspace_id: schemas.EntityId,
+    user_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    if user_id != current_user.id:
+        require_role(db, workspace_id, current_user.id, MANAGER_ROLES)
+    
+    db_member = require_role(db, workspace_id, user_id)
+    if db_member.role == "owner":
+        raise HTTPException(status_code=400, detail="The workspace owner cannot be removed")
+    
+    db.delete(db_member)
+    db.commit()
+    
+    return None
+
+@router.get("/{workspace_id}/projects", response_model=List[schemas.Project])
+def get_workspace_projects(
+    workspace_id: schemas.EntityId,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id)
+    
+    return db.query(models.Project).filter(
+        models.Project.workspace_id == workspace_id
+    ).order_by(models.Project.name).all()
+
+def _bucket():
+    return {"total_duration": 0.0, "entry_count": 0}
+
+def build_team_report(db: Session, workspace_id: str, start_date: datetime, end_date: datetime):
+    members = db.query(models.WorkspaceMember.user_id, models.User.name).join(
+        models.User, models.User.id == models.WorkspaceMember.user_id
+    ).filter(models.WorkspaceMember.workspace_id == workspace_id).all()
+    projects = {p.id: p.name for p in db.query(models.Project.id, models.Project.name).filter(
+        models.Project.workspace_id == workspace_id
+    ).all()}
+    
+    # One grouped pass over every member's entries on workspace projects,
+    # served by ix_projects_workspace_id and ix_time_entries_project_start.
+    rows = db.query(
+        models.TimeEntry.user_id,
+        models.TimeEntry.project_id,
+        func.count(models.TimeEntry.id),
+        func.coalesce(func.sum(models.TimeEntry.duration), 0),
+    ).join(models.Project, models.Project.id == models.TimeEntry.project_id).filter(
+        models.Project.workspace_id == workspace_id,
+        models.TimeEntry.start_time >= start_date,
+        models.TimeEntry.start_time <= end_date,
+        models.TimeEntry.duration != None  # Only completed entries
+    ).group_by(models.TimeEntry.user_id, models.TimeEntry.project_id).all()
+    
+    totals = {}
+    for user_id, project_id, count, duration in rows:
+        bucket = totals.setdefault((user_id, project_id), _bucket())
+        bucket["total_duration"] += duration
+        bucket["entry_count"] += count
+    
+    for user_id, _ in members:
+        for entry in archive.scan(user_id, start_date, end_date, ("duration", "project_id")):
+            if entry.project_id in projects:
+                bucket = totals.setdefault((user_id, entry.project_id), _bucket())
+                bucket["total_duration"] += entry.duration or 0
+                bucket["entry_count"] += 1
+    
+    names = dict(members)
+    member_reports = {user_id: {"user_id": user_id, "name": name, **_bucket(), "projects": []} for user_id, name in members}
+    project_reports = {}
+    total = _bucket()
+    for (user_id, project_id), bucket in totals.items():
+        member = member_reports.setdefault(user_id, {
+            "user_id": user_id, "name": names.get(user_id), **_bucket(), "projects": []
+        })
+        project = project_reports.setdefault(project_id, {
+            "project_id": project_id, "project_name": projects.get(project_id), **_bucket()
+        })
+        member["projects"].append({"project_id": project_id, "project_name": projects.get(project_id), **bucket})
+        for target in (member, project, total):
+            target["total_duration"] += bucket["total_duration"]
+            target["entry_count"] += bucket["entry_count"]
+    
+    for member in member_reports.values():
+        member["projects"].sort(key=lambda x: x["total_duration"], reverse=True)
+    
+    return {
+        "workspace_id": workspace_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "total": total,
+        "members": sorted(member_reports.values(), key=lambda x: x["total_duration"], reverse=True),
+        "projects": sorted(project_reports.values(), key=lambda x: x["total_duration"], reverse=True),
+    }
+
+@router.get("/{workspace_id}/reports/summary", response_model=Dict[str, Any])
+def get_team_summary(
+    workspace_id: schemas.EntityId,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id, MANAGER_ROLES)
+    
+    if not end_date:
+        end_date = datetime.utcnow()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    
+    return build_team_report(db, workspace_id, start_date, end_date)
+
+@router.get("/{workspace_id}/reports/earnings", response_model=Dict[str, Any])
+def get_team_earnings(
+    workspace_id: schemas.EntityId,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    group_by: List[schemas.EarningsDimension] = Query(["user", "project"]),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(utils.get_current_user)
+):
+    require_role(db, workspace_id, current_user.id, MANAGER_ROLES)
+    
+    if not end_date:
+        end_date = datetime.utcnow()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    
+    members = [user_id for user_id, in db.query(models.WorkspaceMember.user_id).filter(
+        models.WorkspaceMember.workspace_id == workspace_id
+    )]
+    return earnings.build_earnings(db, members, start_date, end_date, group_by, workspace_id)
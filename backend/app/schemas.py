@@ -1,6 +1,14 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel, Field, EmailStr
+from typing import Annotated, Any, Dict, List, Literal, Optional
 from datetime import datetime
+from decimal import Decimal
+import uuid
+
+def _canonical_uuid(value: str) -> str:
+    return str(uuid.UUID(value))
+
+# Entity ids are UUIDs in the database; malformed ids are rejected up front.
+EntityId = Annotated[str, AfterValidator(_canonical_uuid)]
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -13,9 +21,17 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    prevent_overlaps: Optional[bool] = None
+    # Minutes before a running timer is auto-stopped; 0 disables, null uses the server default.
+    idle_timeout_minutes: Optional[int] = Field(None, ge=0)
+
 class User(UserBase):
     id: str
     photo_url: Optional[str] = None
+    prevent_overlaps: bool = False
+    idle_timeout_minutes: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -27,25 +43,59 @@ class ProjectBase(BaseModel):
     color: Optional[str] = None
 
 class ProjectCreate(ProjectBase):
-    pass
+    workspace_id: Optional[EntityId] = None
 
 class ProjectUpdate(ProjectBase):
     is_archived: Optional[bool] = None
 
+class ProjectBulkArchive(BaseModel):
+    project_ids: Optional[List[EntityId]] = None
+    # Alternatively (or additionally) every project without entries since this time.
+    inactive_since: Optional[datetime] = None
+    is_archived: bool = True
+
 class Project(ProjectBase):
     id: str
     is_archived: bool
+    total_duration: float = 0
+    entry_count: int = 0
+    last_entry_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     user_id: str
+    workspace_id: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+WorkspaceRole = Literal["owner", "manager", "member"]
+
+class WorkspaceCreate(BaseModel):
+    name: str
+
+class Workspace(WorkspaceCreate):
+    id: str
+    owner_id: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
 
+class WorkspaceMemberCreate(BaseModel):
+    email: EmailStr
+    role: Literal["manager", "member"] = "member"
+
+class WorkspaceMember(BaseModel):
+    user_id: str
+    name: str
+    email: str
+    role: WorkspaceRole
+    joined_at: datetime
+
 class TimeEntryBase(BaseModel):
     description: str
     start_time: datetime
-    project_id: Optional[str] = None
+    project_id: Optional[EntityId] = None
     tags: List[str] = []
 
 class TimeEntryCreate(TimeEntryBase):
@@ -56,7 +106,7 @@ class TimeEntryUpdate(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     duration: Optional[float] = None
-    project_id: Optional[str] = None
+    project_id: Optional[EntityId] = None
     tags: Optional[List[str]] = None
 
 class TimeEntry(TimeEntryBase):
@@ -70,21 +120,140 @@ class TimeEntry(TimeEntryBase):
     class Config:
         from_attributes = True
 
+class EntryOverlap(BaseModel):
+    entry_id: str
+    other_entry_id: str
+    overlap_start: datetime
+    overlap_end: datetime
+    overlap_seconds: float
+
+class RateCreate(BaseModel):
+    hourly_rate: Decimal = Field(ge=0, max_digits=12, decimal_places=2)
+    effective_from: Optional[datetime] = None
+    project_id: Optional[EntityId] = None
+    user_id: Optional[EntityId] = None
+
+class Rate(BaseModel):
+    id: str
+    hourly_rate: Decimal
+    effective_from: datetime
+    project_id: Optional[str] = None
+    user_id: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+EarningsDimension = Literal["project", "month", "user"]
+
+class Tag(BaseModel):
+    name: str
+    usage_count: int
+    last_used_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TagRename(BaseModel):
+    name: str = Field(min_length=1)
+    new_name: str = Field(min_length=1)
+
+class TagMerge(BaseModel):
+    sources: List[str] = Field(min_length=1)
+    target: str = Field(min_length=1)
+
+class TagRewriteResult(BaseModel):
+    updated_entries: int
+
 class TimerStart(BaseModel):
     description: str
-    project_id: Optional[str] = None
+    project_id: Optional[EntityId] = None
     tags: List[str] = []
 
 class TimerStop(BaseModel):
     pass
 
+class TimerResume(BaseModel):
+    # A previous entry, or a suggested description; neither resumes the last stopped entry.
+    entry_id: Optional[EntityId] = None
+    description: Optional[str] = None
+
+class Suggestion(BaseModel):
+    description: str
+    project_id: Optional[str] = None
+    tags: List[str] = []
+    use_count: int
+    last_used_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 class TimeEntryFilters(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
-    project_id: Optional[str] = None
+    project_id: Optional[EntityId] = None
     search_term: Optional[str] = None
     tags: Optional[List[str]] = None
 
+ReportDimension = Literal["day", "week", "month", "project", "tag"]
+
+class ReportRequest(BaseModel):
+    filters: TimeEntryFilters = TimeEntryFilters()
+    group_by: List[ReportDimension] = []
+
+class ExportRequest(TimeEntryFilters):
+    format: Literal["csv"] = "csv"
+
+class JobCreate(BaseModel):
+    kind: Literal["report", "export"]
+    params: Dict[str, Any] = {}
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class Tombstone(BaseModel):
+    entity_type: str
+    entity_id: str
+    change_seq: int
+    deleted_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class SyncEvent(BaseModel):
+    type: Literal["start", "stop"]
+    at: datetime
+    # Replaying the same event id is a no-op, so clients can retry a batch.
+    client_event_id: Optional[str] = None
+    description: str = ""
+    project_id: Optional[EntityId] = None
+    tags: List[str] = []
+
+class SyncRequest(BaseModel):
+    since: int = 0
+    events: List[SyncEvent] = Field(default=[], max_length=500)
+
+class SyncEventResult(BaseModel):
+    client_event_id: Optional[str] = None
+    status: Literal["applied", "duplicate", "conflict", "no_running_timer", "project_not_found"]
+    entry_id: Optional[str] = None
+
+class SyncResponse(BaseModel):
+    cursor: int
+    projects: List[Project] = []
+    time_entries: List[TimeEntry] = []
+    deleted: List[Tombstone] = []
+    results: List[SyncEventResult] = []
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,42 @@
+import asyncio
+import time
+from collections import defaultdict
+
+class SingleFlight:
+    """Shares one in-flight computation among concurrent callers with the same key.
+
+    Keys are (name, ...) tuples; the computation runs on the default executor
+    and every caller awaiting the key receives its result or exception. A
+    caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._stats = defaultdict(lambda: {"executions": 0, "coalesced": 0, "saved_seconds": 0.0})
+
+    async def do(self, key: tuple, fn, *args):
+        flight = self._flights.get(key)
+        if flight is None:
+            loop = asyncio.get_running_loop()
+            flight = {"task": asyncio.ensure_future(loop.run_in_executor(None, fn, *args)), "followers": 0}
+            self._flights[key] = flight
+            started = time.perf_counter()
+            flight["task"].add_done_callback(lambda task: self._landed(key, flight, time.perf_counter() - started))
+        else:
+            flight["followers"] += 1
+        return await asyncio.shield(flight["task"])
+
+    def _landed(self, key: tuple, flight: dict, elapsed: float):
+        self._flights.pop(key, None)
+        stats = self._stats[key[0]]
+        stats["executions"] += 1
+        stats["coalesced"] += flight["followers"]
+        stats["saved_seconds"] += elapsed * flight["followers"]
+
+    def stats(self):
+        return {
+            name: dict(stats, in_flight=sum(1 for key in self._flights if key[0] == name))
+            for name, stats in self._stats.items()
+        }
+
+flights = SingleFlight()
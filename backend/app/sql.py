@@ -0,0 +1,81 @@
+from sqlalchemy import Boolean, DateTime, Float, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+class seconds_between(FunctionElement):
+    """Number of seconds from the first timestamp to the second, computed in SQL."""
+    type = Float()
+    inherit_cache = True
+    name = "seconds_between"
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "EXTRACT(EPOCH FROM (%s - %s))" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+@compiles(seconds_between, "sqlite")
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = [compiler.process(c, **kw) for c in element.clauses]
+    # julianday() is a float of days and is off by microseconds (3599.99998 for
+    # an hour); whole seconds plus the millisecond part are exact.
+    def epoch(timestamp):
+        return "(strftime('%%s', %s) + strftime('%%f', %s) - strftime('%%S', %s))" % (timestamp, timestamp, timestamp)
+    return "ROUND(%s - %s, 3)" % (epoch(end), epoch(start))
+
+class add_minutes(FunctionElement):
+    """A timestamp plus a (possibly computed) number of minutes."""
+    type = DateTime()
+    inherit_cache = True
+    name = "add_minutes"
+
+@compiles(add_minutes)
+def _add_minutes_default(element, compiler, **kw):
+    timestamp, minutes = [compiler.process(c, **kw) for c in element.clauses]
+    return "(%s + make_interval(mins => CAST(%s AS integer)))" % (timestamp, minutes)
+
+@compiles(add_minutes, "sqlite")
+def _add_minutes_sqlite(element, compiler, **kw):
+    timestamp, minutes = [compiler.process(c, **kw) for c in element.clauses]
+    return "strftime('%%Y-%%m-%%d %%H:%%M:%%f', %s, '+' || %s || ' minutes')" % (timestamp, minutes)
+
+class periods_overlap(FunctionElement):
+    """True when [start_a, end_a) and [start_b, end_b) intersect; a NULL end is open."""
+    type = Boolean()
+    inherit_cache = True
+    name = "periods_overlap"
+
+def _period(start, end):
+    # An end before the start is clamped to an empty range instead of raising.
+    return "tsrange(%s, GREATEST(%s, COALESCE(%s, 'infinity'::timestamp)), '[)')" % (start, start, end)
+
+@compiles(periods_overlap)
+def _periods_overlap_default(element, compiler, **kw):
+    start_a, end_a, start_b, end_b = [compiler.process(c, **kw) for c in element.clauses]
+    # Same expression as ix_time_entries_period, so the GiST index applies.
+    return "%s && %s" % (_period(start_a, end_a), _period(start_b, end_b))
+
+@compiles(periods_overlap, "sqlite")
+def _periods_overlap_sqlite(element, compiler, **kw):
+    start_a, end_a, start_b, end_b = [compiler.process(c, **kw) for c in element.clauses]
+    # Empty periods overlap nothing, as with tsrange.
+    conditions = [
+        "%s < COALESCE(%s, '9999-12-31')" % pair
+        for pair in ((start_a, end_b), (start_b, end_a), (start_a, end_a), (start_b, end_b))
+    ]
+    return "(%s)" % " AND ".join(conditions)
+
+class month_of(FunctionElement):
+    """The 'YYYY-MM' month of a timestamp."""
+    type = String()
+    inherit_cache = True
+    name = "month_of"
+
+@compiles(month_of)
+def _month_of_default(element, compiler, **kw):
+    return "to_char(%s, 'YYYY-MM')" % compiler.process(list(element.clauses)[0], **kw)
+
+@compiles(month_of, "sqlite")
+def _month_of_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m', %s)" % compiler.process(list(element.clauses)[0], **kw)
+
+ENTRY_PERIOD = _period("start_time", "end_time")
@@ -0,0 +1,190 @@
+import logging
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import case, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from . import cache, models, utils
+from .database import SessionLocal
+
+load_dotenv()
+
+# Cached candidates are dropped on change; the TTL bounds a load racing a change.
+# With CACHE_BACKEND=memory only the committing worker drops its copy, so the
+# other workers serve the old ranking until the TTL runs out. Deployments with
+# more than one worker use the shared sqlite backend, which drops it everywhere.
+SUGGESTION_CACHE_TTL = float(os.getenv("SUGGESTION_CACHE_TTL", "600"))
+# Only the most recently used descriptions are candidates for ranking.
+SUGGESTION_CANDIDATES = int(os.getenv("SUGGESTION_CANDIDATES", "500"))
+# A use this many days ago counts half as much as one now.
+SUGGESTION_HALF_LIFE_DAYS = float(os.getenv("SUGGESTION_HALF_LIFE_DAYS", "14"))
+
+UPSERT_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+def _key(user_id: str) -> str:
+    return f"suggestions:{user_id}"
+
+def _upsert(db: Session, rows: List[dict]):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = models.Suggestion.__table__
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = dialect.insert(table).values(rows[i:i + UPSERT_BATCH_SIZE])
+        excluded = statement.excluded
+        latest = func.max if dialect is sqlite else func.greatest
+        # A late-arriving older use (an offline sync) counts but keeps the newer project and tags.
+        newer = excluded.last_used_at >= table.c.last_used_at
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.description],
+            set_={
+                "use_count": table.c.use_count + excluded.use_count,
+                "last_used_at": latest(table.c.last_used_at, excluded.last_used_at),
+                "project_id": case((newer, excluded.project_id), else_=table.c.project_id),
+                "tags": case((newer, excluded.tags), else_=table.c.tags),
+            }
+        ))
+
+def entries_stopped(db: Session, entries: Iterable):
+    """Count stopped entries into their users' suggestions, in the caller's transaction."""
+    rows = {}
+    for entry in entries:
+        if not entry.description:
+            continue
+        key = (entry.user_id, entry.description)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                "id": utils.generate_id(),
+                "description": entry.description,
+                "use_count": 0,
+                "last_used_at": entry.end_time,
+                "user_id": entry.user_id,
+            }
+        row["use_count"] += 1
+        if entry.end_time >= row["last_used_at"]:
+            row.update(last_used_at=entry.end_time, project_id=entry.project_id, tags=entry.tags or [])
+    if not rows:
+        return
+
+    _upsert(db, list(rows.values()))
+    db.info.setdefault("suggestions_changed", set()).update(user_id for user_id, _ in rows)
+
+def entry_uncounted(db: Session, user_id: str, description: str):
+    """Take back the use of a stopped entry that was deleted or edited to another description."""
+    if not description:
+        return
+    suggestions = models.Suggestion
+    matching = [suggestions.user_id == user_id, suggestions.description == description]
+    db.query(suggestions).filter(*matching).update(
+        {suggestions.use_count: suggestions.use_count - 1}, synchronize_session=False
+    )
+    db.query(suggestions).filter(*matching, suggestions.use_count <= 0).delete(synchronize_session=False)
+    db.info.setdefault("suggestions_changed", set()).add(user_id)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate(session: Session):
+    # Cached rankings are dropped only once the new counts are visible. The
+    # data is committed by now, so a cache failure must not fail the request;
+    # the stale ranking then lasts until SUGGESTION_CACHE_TTL.
+    for user_id in session.info.pop("suggestions_changed", ()):
+        try:
+            cache.cache.delete(_key(user_id))
+        except Exception:
+            logger.exception("Could not drop cached suggestions of %s", user_id)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard(session: Session):
+    session.info.pop("suggestions_changed", None)
+
+def _score(use_count: int, last_used_at: datetime, now: datetime) -> float:
+    age_days = max((now - last_used_at).total_seconds(), 0) / 86400
+    return use_count * 0.5 ** (age_days / SUGGESTION_HALF_LIFE_DAYS)
+
+def _load(db: Session, user_id: str) -> List[dict]:
+    suggestions = models.Suggestion
+    rows = db.query(
+        suggestions.description,
+        suggestions.project_id,
+        suggestions.tags,
+        suggestions.use_count,
+        suggestions.last_used_at,
+    ).filter(
+        suggestions.user_id == user_id
+    ).order_by(suggestions.last_used_at.desc()).limit(SUGGESTION_CANDIDATES).all()
+    return [row._asdict() for row in rows]
+
+def ranked(db: Session, user_id: str, query: str = "", limit: int = 10) -> List[dict]:
+    """The user's descriptions best matching `query`, by frequency decayed with age."""
+    candidates = cache.cache.get(_key(user_id))
+    if candidates is None:
+        candidates = _load(db, user_id)
+        cache.cache.set(_key(user_id), candidates, SUGGESTION_CACHE_TTL)
+
+    query = query.strip().lower()
+    now = datetime.utcnow()
+    matches = [
+        suggestion for suggestion in candidates
+        if not query or query in suggestion["description"].lower()
+    ]
+    matches.sort(key=lambda s: _score(s["use_count"], s["last_used_at"], now), reverse=True)
+    return matches[:limit]
+
+def find(db: Session, user_id: str, description: str) -> Optional[dict]:
+    for suggestion in cache.cache.get(_key(user_id)) or ():
+        if suggestion["description"] == description:
+            return suggestion
+    row = db.query(
+        models.Suggestion.description,
+        models.Suggestion.project_id,
+        models.Suggestion.tags,
+    ).filter(
+        models.Suggestion.user_id == user_id,
+        models.Suggestion.description == description
+    ).first()
+    return row._asdict() if row else None
+
+def rebuild_suggestions(db: Session, user_id: str) -> int:
+    """Recount a user's suggestions from their completed entries."""
+    entries = models.TimeEntry
+    ranked_entries = select(
+        entries.description,
+        entries.project_id,
+        entries.tags,
+        entries.end_time,
+        func.count().over(partition_by=entries.description).label("use_count"),
+        func.row_number().over(
+            partition_by=entries.description,
+            order_by=(entries.end_time.desc(), entries.id.desc())
+        ).label("rank"),
+    ).where(
+        entries.user_id == user_id,
+        entries.end_time != None,
+        entries.description != ""
+    ).subquery()
+    latest = db.execute(select(ranked_entries).where(ranked_entries.c.rank == 1)).all()
+
+    db.query(models.Suggestion).filter(models.Suggestion.user_id == user_id).delete(synchronize_session=False)
+    _upsert(db, [{
+        "id": utils.generate_id(),
+        "description": row.description,
+        "project_id": row.project_id,
+        "tags": row.tags or [],
+        "use_count": row.use_count,
+        "last_used_at": row.end_time,
+        "user_id": user_id,
+    } for row in latest])
+    db.info.setdefault("suggestions_changed", set()).add(user_id)
+    return len(latest)
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(models.User.id).all()]
+        total = sum(rebuild_suggestions(db, user_id) for user_id in user_ids)
+        db.commit()
+        print(f"Rebuilt {total} suggestions for {len(user_ids)} users")
+    finally:
+        db.close()
@@ -0,0 +1,73 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from . import models
+
+# Every write to a user's projects or time entries is stamped with the next
+# value of users.sync_seq. Bumping it takes the user row lock, so sequence
+# numbers are handed out in commit order and a client cursor never skips a
+# change that commits later with a lower number.
+
+def next_seq(db: Session, user_id: str) -> int:
+    return db.execute(
+        update(models.User).where(
+            models.User.id == user_id
+        ).values(sync_seq=models.User.sync_seq + 1).returning(models.User.sync_seq),
+        execution_options={"synchronize_session": False}
+    ).scalar_one()
+
+def update_entries(db: Session, criteria, values: dict) -> int:
+    """Set-based update of time entries that may belong to several users.
+
+    Each affected user gets one sequence bump and their entries are stamped
+    with it, all in two statements however many rows match.
+    """
+    entries = models.TimeEntry
+    db.execute(
+        update(models.User).where(
+            models.User.id.in_(select(entries.user_id).where(*criteria).distinct())
+        ).values(sync_seq=models.User.sync_seq + 1),
+        execution_options={"synchronize_session": False}
+    )
+    return db.query(entries).filter(*criteria).update({
+        **values,
+        entries.change_seq: select(models.User.sync_seq).where(
+            models.User.id == entries.user_id
+        ).scalar_subquery(),
+    }, synchronize_session=False)
+
+def record_deletion(db: Session, user_id: str, entity_type: str, entity_id: str, seq: int):
+    db.add(models.Tombstone(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        change_seq=seq,
+        user_id=user_id
+    ))
+
+def current_seq(db: Session, user_id: str) -> int:
+    return db.query(models.User.sync_seq).filter(models.User.id == user_id).scalar() or 0
+
+def changes_since(db: Session, user_id: str, since: int):
+    """Projects, entries and tombstones with since < change_seq <= cursor.
+
+    Entries moved to the archive leave time_entries without a tombstone: they
+    are finished history that still counts in reports, so a client keeps the
+    copy it has. A full sync (since=0) returns live entries only.
+    """
+    cursor = current_seq(db, user_id)
+
+    def changed(model):
+        query = db.query(model).filter(
+            model.user_id == user_id,
+            model.change_seq <= cursor
+        )
+        # A full sync also returns rows written before sequencing existed (seq 0).
+        if since > 0:
+            query = query.filter(model.change_seq > since)
+        return query.order_by(model.change_seq).all()
+
+    return {
+        "cursor": cursor,
+        "projects": changed(models.Project),
+        "time_entries": changed(models.TimeEntry),
+        "deleted": changed(models.Tombstone) if since > 0 else [],
+    }
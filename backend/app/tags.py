@@ -0,0 +1,158 @@
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import Text, func, or_, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import archive, models, sync, utils
+
+# The catalog mirrors the tags stored inside time_entries.tags: usage_count is
+# the number of entries carrying the tag. Archived entries count as well.
+
+UPSERT_BATCH_SIZE = 1000
+
+def normalize(name: str) -> str:
+    return name.strip().lower()
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _upsert(db: Session, user_id: str, usages):
+    """Add (name, count, used_at) usages to the catalog in multi-row upserts."""
+    usages = list(usages)
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    tags = models.Tag.__table__
+    for i in range(0, len(usages), UPSERT_BATCH_SIZE):
+        statement = dialect.insert(tags).values([{
+            "id": utils.generate_id(),
+            "name": name,
+            "normalized": normalize(name),
+            "usage_count": count,
+            "last_used_at": used_at,
+            "user_id": user_id,
+        } for name, count, used_at in usages[i:i + UPSERT_BATCH_SIZE]])
+        excluded = statement.excluded
+        latest = func.max if dialect is sqlite else func.greatest
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[tags.c.user_id, tags.c.name],
+            set_={
+                "usage_count": tags.c.usage_count + excluded.usage_count,
+                "last_used_at": func.coalesce(
+                    latest(tags.c.last_used_at, excluded.last_used_at),
+                    excluded.last_used_at, tags.c.last_used_at
+                ),
+            }
+        ))
+
+def _decrement(db: Session, user_id: str, names: Iterable[str]):
+    names = list(names)
+    if not names:
+        return
+    db.query(models.Tag).filter(
+        models.Tag.user_id == user_id,
+        models.Tag.name.in_(names)
+    ).update({models.Tag.usage_count: models.Tag.usage_count - 1}, synchronize_session=False)
+
+def tags_added(db: Session, user_id: str, names: Optional[List[str]], used_at: datetime):
+    _upsert(db, user_id, [(name, 1, used_at) for name in set(names or [])])
+
+def tags_removed(db: Session, user_id: str, names: Optional[List[str]]):
+    _decrement(db, user_id, set(names or []))
+
+def tags_changed(db: Session, user_id: str, old: Optional[List[str]], new: Optional[List[str]], used_at: datetime):
+    old, new = set(old or []), set(new or [])
+    _decrement(db, user_id, old - new)
+    _upsert(db, user_id, [(name, 1, used_at) for name in new - old])
+
+def autocomplete(db: Session, user_id: str, prefix: str, limit: int = 10):
+    pattern = _like_escape(normalize(prefix)) + "%"
+    # LIKE 'prefix%' is a range scan of ix_tags_user_normalized (text_pattern_ops on PostgreSQL).
+    return db.query(models.Tag).filter(
+        models.Tag.user_id == user_id,
+        models.Tag.normalized.like(pattern, escape="\\"),
+        models.Tag.usage_count > 0
+    ).order_by(
+        models.Tag.usage_count.desc(), models.Tag.last_used_at.desc(), models.Tag.name
+    ).limit(limit).all()
+
+def merge_tags(db: Session, user_id: str, sources: List[str], target: str) -> int:
+    """Rewrite every live entry tagged with one of `sources` to carry `target` instead.
+
+    Archived entries keep their tags, so a source still used in the archive
+    keeps its catalog row, counting only that usage.
+    """
+    sources = [name for name in dict.fromkeys(sources) if name != target]
+    if not sources:
+        return 0
+
+    entries = models.TimeEntry
+    # Tags are stored as JSON text, so a LIKE on the encoded name narrows the scan.
+    encoded = type_coerce(entries.tags, Text)
+    candidates = db.query(entries.id, entries.tags, entries.start_time).filter(
+        entries.user_id == user_id,
+        or_(*[encoded.like("%" + _like_escape(json.dumps(name)) + "%", escape="\\") for name in sources])
+    ).all()
+
+    seq = sync.next_seq(db, user_id)
+    rewrites = []
+    gained = 0
+    last_used = None
+    for entry_id, tags, start_time in candidates:
+        tags = tags or []
+        if not any(name in tags for name in sources):
+            continue
+        if target not in tags:
+            gained += 1
+        rewritten = list(dict.fromkeys(target if name in sources else name for name in tags))
+        rewrites.append({"id": entry_id, "tags": rewritten, "change_seq": seq})
+        last_used = max(last_used, start_time) if last_used else start_time
+
+    if rewrites:
+        # Bulk UPDATE by primary key, executed as one batch.
+        db.execute(update(entries), rewrites)
+
+    archived = {}
+    for entry in archive.iter_scan(user_id, columns=("tags",)):
+        for name in set(entry.tags or []).intersection(sources):
+            count, used_at = archived.get(name, (0, entry.start_time))
+            archived[name] = (count + 1, max(used_at, entry.start_time))
+
+    db.query(models.Tag).filter(
+        models.Tag.user_id == user_id,
+        models.Tag.name.in_([name for name in sources if name not in archived])
+    ).delete(synchronize_session=False)
+    for name, (count, used_at) in archived.items():
+        db.query(models.Tag).filter(
+            models.Tag.user_id == user_id,
+            models.Tag.name == name
+        ).update({models.Tag.usage_count: count, models.Tag.last_used_at: used_at}, synchronize_session=False)
+    _upsert(db, user_id, [(target, gained, last_used)])
+    return len(rewrites)
+
+def rebuild_tag_catalog(db: Session, user_id: str):
+    """Recount a user's catalog from their live and archived entries."""
+    counts = {}
+    last_used = {}
+    rows = db.query(models.TimeEntry.tags, models.TimeEntry.start_time).filter(
+        models.TimeEntry.user_id == user_id
+    ).yield_per(1000)
+    for tags, start_time in list(rows) + [(e.tags, e.start_time) for e in archive.scan(user_id, columns=("tags",))]:
+        for name in set(tags or []):
+            counts[name] = counts.get(name, 0) + 1
+            last_used[name] = max(last_used.get(name, start_time), start_time)
+
+    db.query(models.Tag).filter(models.Tag.user_id == user_id).delete(synchronize_session=False)
+    _upsert(db, user_id, [(name, count, last_used[name]) for name, count in counts.items()])
+    return len(counts)
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(models.User.id).all()]
+        total = sum(rebuild_tag_catalog(db, user_id) for user_id in user_ids)
+        db.commit()
+        print(f"Rebuilt {total} tags for {len(user_ids)} users")
+    finally:
+        db.close()
@@ -1,9 +1,13 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
+import os
+import time
 import uuid
 from fastapi import Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from .database import get_db
@@ -43,7 +47,7 @@ def decode_token(token):
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,5 +64,44 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     
     return user
 
+def uuid7():
+    """Time-ordered UUID (version 7): 48-bit millisecond timestamp, then random bits."""
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= ((rand >> 62) & 0xFFF) << 64
+    value |= 0b10 << 62
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF
+    return uuid.UUID(int=value)
+
 def generate_id():
-    return str(uuid.uuid4())
+    return str(uuid7())
+
+def parse_fields(fields: Optional[str], model, schema) -> Optional[List[str]]:
+    """Resolve a comma separated fields= parameter to the columns to select."""
+    if not fields:
+        return None
+
+    columns = model.__table__.columns
+    selected = []
+    for name in fields.split(","):
+        name = name.strip()
+        if not name or name in selected:
+            continue
+        if name not in schema.model_fields or name not in columns:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field: {name}"
+            )
+        selected.append(name)
+
+    if "id" not in selected:
+        selected.insert(0, "id")
+
+    return selected
+
+def sparse_response(rows, fields: List[str]):
+    return JSONResponse(content=jsonable_encoder([
+        {field: getattr(row, field) for field in fields} for row in rows
+    ]))
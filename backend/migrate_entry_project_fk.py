@@ -0,0 +1,58 @@
+from sqlalchemy import text
+from app import partitions
+from app.database import engine
+
+CONSTRAINT = "time_entries_project_id_fkey"
+
+def migrate_entry_project_fk():
+    """Make time_entries.project_id ON DELETE SET NULL on databases created before it was."""
+    if engine.dialect.name != "postgresql":
+        # SQLite can only change a foreign key by rebuilding the table. Deleting
+        # a project detaches its entries before the delete, so old files work as is.
+        print("Nothing to migrate on SQLite")
+        return True
+
+    try:
+        with engine.begin() as conn:
+            foreign_keys = conn.execute(text("""
+            SELECT conname, confdeltype
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND conparentid = 0
+              AND conrelid = 'time_entries'::regclass
+              AND confrelid = 'projects'::regclass
+            """)).all()
+
+            if foreign_keys and all(action == "n" for _, action in foreign_keys):
+                print("time_entries.project_id is already ON DELETE SET NULL")
+                return True
+
+            for name, _ in foreign_keys:
+                print(f"Dropping {name}...")
+                conn.execute(text(f"ALTER TABLE time_entries DROP CONSTRAINT {name}"))
+
+            print(f"Adding {CONSTRAINT} ON DELETE SET NULL...")
+            definition = "FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE SET NULL"
+            # Partitioned tables cannot take NOT VALID foreign keys.
+            validate_later = not partitions.is_partitioned(conn)
+            conn.execute(text(
+                f"ALTER TABLE time_entries ADD CONSTRAINT {CONSTRAINT} {definition}"
+                + (" NOT VALID" if validate_later else "")
+            ))
+
+        if validate_later:
+            # In its own transaction, the scan only blocks schema changes, not writes.
+            print(f"Validating {CONSTRAINT}...")
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE time_entries VALIDATE CONSTRAINT {CONSTRAINT}"))
+
+        return True
+    except Exception as e:
+        print(f'Error migrating time entry foreign key: {e}')
+        return False
+
+if __name__ == "__main__":
+    if migrate_entry_project_fk():
+        print("Time entry foreign key migration completed successfully")
+    else:
+        print("Time entry foreign key migration failed")
@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, text
+from app.database import engine
+
+def migrate_job_leases():
+    """Add the lease heartbeat column to a jobs table created before it existed."""
+    try:
+        with engine.begin() as conn:
+            columns = {column["name"] for column in inspect(conn).get_columns("jobs")}
+            if "heartbeat_at" in columns:
+                print("jobs.heartbeat_at already exists")
+            else:
+                print("Adding jobs.heartbeat_at...")
+                conn.execute(text("ALTER TABLE jobs ADD COLUMN heartbeat_at TIMESTAMP"))
+        return True
+    except Exception as e:
+        print(f'Error migrating jobs: {e}')
+        return False
+
+if __name__ == "__main__":
+    if migrate_job_leases():
+        print("Job lease migration completed successfully")
+    else:
+        print("Job lease migration failed")
@@ -0,0 +1,57 @@
+from sqlalchemy import text
+from app.database import engine
+
+KEY_COLUMNS = {
+    "users": ["id"],
+    "projects": ["id", "user_id"],
+    "time_entries": ["id", "user_id", "project_id"],
+}
+
+# Left behind by the old models, which indexed primary keys a second time.
+REDUNDANT_INDEXES = ["ix_users_id", "ix_projects_id", "ix_time_entries_id"]
+
+def migrate_uuid_keys():
+    """Convert VARCHAR primary and foreign keys to the native PostgreSQL uuid type."""
+    try:
+        with engine.begin() as conn:
+            foreign_keys = conn.execute(text("""
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND conparentid = 0
+              AND confrelid IN ('users'::regclass, 'projects'::regclass)
+            """)).all()
+
+            print(f"Dropping {len(foreign_keys)} foreign keys...")
+            for table, name, _ in foreign_keys:
+                conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+
+            for table, columns in KEY_COLUMNS.items():
+                types = dict(conn.execute(text(
+                    "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = :table"
+                ), {"table": table}).all())
+                pending = [c for c in columns if types.get(c) != "uuid"]
+                if not pending:
+                    continue
+                print(f"Converting {table}: {', '.join(pending)}")
+                conn.execute(text(f"ALTER TABLE {table} " + ", ".join(
+                    f"ALTER COLUMN {c} TYPE uuid USING {c}::uuid" for c in pending
+                )))
+
+            print("Restoring foreign keys...")
+            for table, name, definition in foreign_keys:
+                conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+
+            for index in REDUNDANT_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+        return True
+    except Exception as e:
+        print(f'Error migrating keys: {e}')
+        return False
+
+if __name__ == "__main__":
+    if migrate_uuid_keys():
+        print("UUID key migration completed successfully")
+    else:
+        print("UUID key migration failed")
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import uuid
+
+# The engine, cache and rate limiter are created at import, so configure them first.
+_tmp = tempfile.mkdtemp(prefix="timekeeper-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["RATE_LIMIT_PATH"] = os.path.join(_tmp, "ratelimit.db")
+os.environ["AUTH_IP_BURST"] = "100000"
+os.environ["AUTH_ACCOUNT_BURST"] = "100000"
+os.environ["ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+os.environ["JOB_RESULTS_DIR"] = os.path.join(_tmp, "job_results")
+os.environ["PROFILE_DIR"] = os.path.join(_tmp, "profiles")
+os.environ["OUTBOX_FILE_PATH"] = os.path.join(_tmp, "outbox.jsonl")
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+@pytest.fixture(scope="session")
+def client():
+    # Without the lifespan no job runner, idle sweeper or outbox relay is started.
+    return TestClient(app)
+
+@pytest.fixture
+def login(client):
+    """Register a fresh user and return their auth headers."""
+    def login(password: str = "secret"):
+        email = f"{uuid.uuid4().hex}@example.com"
+        response = client.post("/auth/register", json={"email": email, "name": "Test", "password": password})
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/token", data={"username": email, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": "Bearer " + response.json()["access_token"]}
+    return login
+
+@pytest.fixture
+def auth(login):
+    return login()
+
+@pytest.fixture
+def push(client):
+    """Replay offline timer events through /sync."""
+    def push(headers, *events, since: int = 0):
+        response = client.post("/sync/", headers=headers, json={"since": since, "events": list(events)})
+        assert response.status_code == 200, response.text
+        return response.json()
+    return push
@@ -0,0 +1,46 @@
+from app.cache import MemoryCache, SQLiteCache
+
+def test_set_is_seen_by_another_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path), SQLiteCache(path)
+
+    first.set("key", {"value": 1})
+    assert second.get("key") == {"value": 1}
+
+def test_delete_invalidates_other_instances_local_copy(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path), SQLiteCache(path)
+
+    first.set("key", "old")
+    assert second.get("key") == "old"  # now held in second's local layer too
+
+    first.delete("key")
+    assert second.get("key") is None
+
+    first.set("key", "new")
+    assert second.get("key") == "new"
+
+def test_overwrite_invalidates_other_instances_local_copy(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path), SQLiteCache(path)
+
+    second.set("key", "old")
+    assert second.get("key") == "old"
+    first.set("key", "new")
+    assert second.get("key") == "new"
+
+def test_ttl_expires_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    cache.set("key", "value", ttl=-1)
+    assert cache.get("key") is None
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=100)
+    cache.set("a", "a", size=40)
+    cache.set("b", "b", size=40)
+    assert cache.get("a") == "a"
+
+    cache.set("c", "c", size=40)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
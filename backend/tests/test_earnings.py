@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+def _track_hour(push, headers, project_id, day):
+    push(
+        headers,
+        {"type": "start", "at": f"{day}T09:00:00", "description": "Work", "project_id": project_id},
+        {"type": "stop", "at": f"{day}T10:00:00"},
+    )
+
+def _amounts(client, headers):
+    report = client.get("/reports/earnings", headers=headers, params={
+        "start_date": "2025-01-01T00:00:00",
+        "end_date": "2025-12-31T00:00:00",
+        "group_by": "project",
+    })
+    assert report.status_code == 200, report.text
+    return {row["project_name"]: Decimal(str(row["amount"])) for row in report.json()["rows"]}
+
+def _rate(client, headers, **rate):
+    response = client.post("/rates/", headers=headers, json=rate)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_rate_precedence(client, auth, push):
+    me = client.get("/auth/me", headers=auth).json()
+    default_only = client.post("/projects/", headers=auth, json={"name": "Default"}).json()
+    project_rated = client.post("/projects/", headers=auth, json={"name": "Project"}).json()
+    member_rated = client.post("/projects/", headers=auth, json={"name": "Member"}).json()
+    for project in (default_only, project_rated, member_rated):
+        _track_hour(push, auth, project["id"], "2025-03-03")
+
+    _rate(client, auth, hourly_rate="50")
+    _rate(client, auth, hourly_rate="80", project_id=project_rated["id"])
+    _rate(client, auth, hourly_rate="80", project_id=member_rated["id"])
+    _rate(client, auth, hourly_rate="120", project_id=member_rated["id"], user_id=me["id"])
+
+    assert _amounts(client, auth) == {
+        "Default": Decimal("50"),
+        "Project": Decimal("80"),
+        "Member": Decimal("120"),
+    }
+
+def test_rate_applies_from_its_effective_date(client, auth, push):
+    project = client.post("/projects/", headers=auth, json={"name": "Retainer"}).json()
+    _track_hour(push, auth, project["id"], "2025-03-03")
+    _track_hour(push, auth, project["id"], "2025-06-02")
+
+    _rate(client, auth, hourly_rate="50", project_id=project["id"])
+    _rate(client, auth, hourly_rate="70", project_id=project["id"], effective_from="2025-05-01T00:00:00")
+
+    assert _amounts(client, auth) == {"Retainer": Decimal("120")}
+
+def test_unrated_time_earns_nothing(client, auth, push):
+    project = client.post("/projects/", headers=auth, json={"name": "Pro bono"}).json()
+    _track_hour(push, auth, project["id"], "2025-03-03")
+
+    assert _amounts(client, auth) == {"Pro bono": Decimal("0")}
+
+def test_only_project_managers_set_project_rates(client, login):
+    owner, outsider = login(), login()
+    project = client.post("/projects/", headers=owner, json={"name": "Private"}).json()
+
+    response = client.post("/rates/", headers=outsider, json={"hourly_rate": "10", "project_id": project["id"]})
+    assert response.status_code in (403, 404)
@@ -0,0 +1,40 @@
+def _track(push, headers):
+    push(
+        headers,
+        {"type": "start", "at": "2025-03-03T09:00:00", "description": "Sparse", "tags": ["a"]},
+        {"type": "stop", "at": "2025-03-03T10:00:00"},
+    )
+
+def test_entries_return_only_requested_fields(client, auth, push):
+    _track(push, auth)
+
+    entries = client.get("/timer/entries", headers=auth, params={"fields": "description,duration"}).json()
+    assert entries == [{"id": entries[0]["id"], "description": "Sparse", "duration": 3600.0}]
+
+def test_projects_return_only_requested_fields(client, auth):
+    project = client.post("/projects/", headers=auth, json={"name": "Sparse", "color": "#fff"}).json()
+
+    projects = client.get("/projects/", headers=auth, params={"fields": "name"}).json()
+    assert projects == [{"id": project["id"], "name": "Sparse"}]
+
+def test_filtered_entries_return_only_requested_fields(client, auth, push):
+    _track(push, auth)
+
+    response = client.post("/reports/time-entries", headers=auth, params={"fields": "tags"}, json={"tags": ["a"]})
+    assert response.status_code == 200, response.text
+    assert [set(entry) for entry in response.json()] == [{"id", "tags"}]
+
+def test_unknown_field_is_rejected(client, auth):
+    for path in ("/timer/entries", "/projects/"):
+        response = client.get(path, headers=auth, params={"fields": "description,password"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Unknown field: password"
+
+    response = client.post("/reports/time-entries", headers=auth, params={"fields": "user"}, json={})
+    assert response.status_code == 400
+
+def test_empty_fields_returns_whole_objects(client, auth, push):
+    _track(push, auth)
+
+    entries = client.get("/timer/entries", headers=auth, params={"fields": ""}).json()
+    assert {"id", "description", "start_time", "end_time", "duration", "tags"} <= set(entries[0])
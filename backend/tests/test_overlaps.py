@@ -0,0 +1,52 @@
+def _event(type, at, **fields):
+    return {"type": type, "at": at, **fields}
+
+def _track(push, headers, start, stop, description):
+    results = push(
+        headers,
+        _event("start", start, description=description),
+        _event("stop", stop),
+    )["results"]
+    assert [r["status"] for r in results] == ["applied", "applied"]
+    return results[0]["entry_id"]
+
+def test_overlapping_entries_are_reported(client, auth, push):
+    first = _track(push, auth, "2025-03-03T09:00:00", "2025-03-03T11:00:00", "Design")
+    second = _track(push, auth, "2025-03-03T10:00:00", "2025-03-03T12:00:00", "Review")
+    _track(push, auth, "2025-03-03T13:00:00", "2025-03-03T14:00:00", "Lunch")
+
+    pairs = client.get("/timer/entries/overlaps", headers=auth).json()
+    assert len(pairs) == 1
+    assert {pairs[0]["entry_id"], pairs[0]["other_entry_id"]} == {first, second}
+    assert pairs[0]["overlap_seconds"] == 3600
+
+def test_overlaps_are_limited_to_the_range(client, auth, push):
+    _track(push, auth, "2025-03-03T09:00:00", "2025-03-03T11:00:00", "Monday")
+    _track(push, auth, "2025-03-03T10:00:00", "2025-03-03T12:00:00", "Monday too")
+    _track(push, auth, "2025-03-05T09:00:00", "2025-03-05T11:00:00", "Wednesday")
+    _track(push, auth, "2025-03-05T10:00:00", "2025-03-05T12:00:00", "Wednesday too")
+
+    pairs = client.get("/timer/entries/overlaps", headers=auth, params={
+        "start_date": "2025-03-05T00:00:00",
+        "end_date": "2025-03-06T00:00:00",
+    }).json()
+    assert len(pairs) == 1
+    assert pairs[0]["overlap_start"].startswith("2025-03-05")
+
+def test_prevent_overlaps_rejects_overlapping_edit(client, auth, push):
+    _track(push, auth, "2025-03-03T09:00:00", "2025-03-03T11:00:00", "Design")
+    later = _track(push, auth, "2025-03-03T12:00:00", "2025-03-03T13:00:00", "Review")
+    assert client.put("/auth/me", headers=auth, json={"prevent_overlaps": True}).status_code == 200
+
+    response = client.put(f"/timer/entries/{later}", headers=auth, json={"start_time": "2025-03-03T10:30:00"})
+    assert response.status_code == 400
+
+    response = client.put(f"/timer/entries/{later}", headers=auth, json={"start_time": "2025-03-03T11:00:00"})
+    assert response.status_code == 200, response.text
+
+def test_prevent_overlaps_rejects_overlapping_start(client, auth, push):
+    _track(push, auth, "2025-03-03T09:00:00", "2025-03-03T11:00:00", "Design")
+    client.put("/auth/me", headers=auth, json={"prevent_overlaps": True})
+
+    results = push(auth, _event("start", "2025-03-03T10:00:00", description="Inside"))["results"]
+    assert results[0]["status"] == "conflict"
@@ -0,0 +1,63 @@
+def test_cursor_returns_only_later_changes(client, auth, push):
+    project = client.post("/projects/", headers=auth, json={"name": "Client work"}).json()
+    full = client.get("/sync/", headers=auth).json()
+    assert [p["id"] for p in full["projects"]] == [project["id"]]
+    assert full["time_entries"] == []
+
+    push(auth, {"type": "start", "at": "2025-03-03T09:00:00", "description": "Call", "project_id": project["id"]})
+
+    changes = client.get("/sync/", headers=auth, params={"since": full["cursor"]}).json()
+    assert changes["cursor"] > full["cursor"]
+    assert [e["description"] for e in changes["time_entries"]] == ["Call"]
+    # The project's counters moved, so it is sent again as well.
+    assert [p["id"] for p in changes["projects"]] == [project["id"]]
+
+    unchanged = client.get("/sync/", headers=auth, params={"since": changes["cursor"]}).json()
+    assert unchanged["cursor"] == changes["cursor"]
+    assert unchanged["time_entries"] == unchanged["projects"] == unchanged["deleted"] == []
+
+def test_deleted_entry_leaves_a_tombstone(client, auth, push):
+    entry_id = push(
+        auth,
+        {"type": "start", "at": "2025-03-03T09:00:00", "description": "Mistake"},
+        {"type": "stop", "at": "2025-03-03T09:05:00"},
+    )["results"][0]["entry_id"]
+    cursor = client.get("/sync/", headers=auth).json()["cursor"]
+
+    assert client.delete(f"/timer/entries/{entry_id}", headers=auth).status_code == 204
+
+    changes = client.get("/sync/", headers=auth, params={"since": cursor}).json()
+    assert [(t["entity_type"], t["entity_id"]) for t in changes["deleted"]] == [("time_entry", entry_id)]
+    assert changes["deleted"][0]["change_seq"] == changes["cursor"]
+    # A full sync only lists what exists.
+    full = client.get("/sync/", headers=auth).json()
+    assert full["time_entries"] == full["deleted"] == []
+
+def test_cursors_are_per_user(client, login, push):
+    alice, bob = login(), login()
+    push(alice, {"type": "start", "at": "2025-03-03T09:00:00", "description": "Alice"})
+
+    changes = client.get("/sync/", headers=bob).json()
+    assert changes["cursor"] == 0
+    assert changes["time_entries"] == []
+
+def test_replayed_events_are_duplicates(client, auth, push):
+    batch = [
+        {"type": "start", "at": "2025-03-03T09:00:00", "description": "Offline", "client_event_id": "e1"},
+    ]
+    first = push(auth, *batch)["results"]
+    retry = push(auth, *batch)["results"]
+    assert first[0]["status"] == "applied"
+    assert retry[0]["status"] == "duplicate"
+    assert retry[0]["entry_id"] == first[0]["entry_id"]
+
+def test_push_reports_unusable_events(client, login, push):
+    owner, outsider = login(), login()
+    project = client.post("/projects/", headers=owner, json={"name": "Private"}).json()
+
+    results = push(
+        outsider,
+        {"type": "stop", "at": "2025-03-03T09:00:00"},
+        {"type": "start", "at": "2025-03-03T09:00:00", "description": "x", "project_id": project["id"]},
+    )["results"]
+    assert [r["status"] for r in results] == ["no_running_timer", "project_not_found"]
@@ -0,0 +1,54 @@
+def test_start_and_stop(client, auth):
+    started = client.post("/timer/start", headers=auth, json={"description": "Write report"})
+    assert started.status_code == 200, started.text
+    assert started.json()["end_time"] is None
+
+    current = client.get("/timer/current", headers=auth)
+    assert current.json()["id"] == started.json()["id"]
+
+    stopped = client.post("/timer/stop", headers=auth)
+    assert stopped.status_code == 200, stopped.text
+    assert stopped.json()["id"] == started.json()["id"]
+    assert stopped.json()["end_time"] is not None
+    assert stopped.json()["duration"] >= 0
+
+def test_second_start_is_rejected(client, auth):
+    assert client.post("/timer/start", headers=auth, json={"description": "First"}).status_code == 200
+
+    second = client.post("/timer/start", headers=auth, json={"description": "Second"})
+    assert second.status_code == 400
+    assert "running timer" in second.json()["detail"]
+
+def test_stop_without_running_timer(client, auth):
+    assert client.post("/timer/stop", headers=auth).status_code == 404
+
+def test_idempotency_key_replays_the_same_entry(client, auth):
+    headers = {**auth, "Idempotency-Key": "start-1"}
+    first = client.post("/timer/start", headers=headers, json={"description": "Retry me"})
+    retry = client.post("/timer/start", headers=headers, json={"description": "Retry me"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+
+    entries = client.get("/timer/entries", headers=auth).json()
+    assert [entry["id"] for entry in entries] == [first.json()["id"]]
+
+def test_idempotency_keys_are_per_user(client, login):
+    alice, bob = login(), login()
+    first = client.post("/timer/start", headers={**alice, "Idempotency-Key": "same"}, json={"description": "A"})
+    other = client.post("/timer/start", headers={**bob, "Idempotency-Key": "same"}, json={"description": "B"})
+    assert first.status_code == other.status_code == 200
+    assert other.json()["id"] != first.json()["id"]
+
+def test_cannot_start_on_another_users_project(client, login):
+    owner, outsider = login(), login()
+    project = client.post("/projects/", headers=owner, json={"name": "Private"}).json()
+
+    response = client.post("/timer/start", headers=outsider, json={"description": "x", "project_id": project["id"]})
+    assert response.status_code == 404
+
+def test_stopped_description_is_suggested(client, auth):
+    client.post("/timer/start", headers=auth, json={"description": "Standup"})
+    client.post("/timer/stop", headers=auth)
+
+    suggestions = client.get("/timer/suggestions", headers=auth, params={"q": "stand"}).json()
+    assert [s["description"] for s in suggestions] == ["Standup"]
@@ -1,10 +1,12 @@
 import os
+import sys
 from dotenv import load_dotenv
 import psycopg2
+from app import partitions
 from app.database import Base, engine
 from app.models import User, Project, TimeEntry
 
-def update_database_schema():
+def update_database_schema(partitioned=False):
     """Update the PostgreSQL database schema for TimeKeeperWeb application."""
     load_dotenv()
     
@@ -25,38 +27,173 @@ def update_database_schema():
         
         print("Dropping existing tables...")
         cursor.execute("DROP TABLE IF EXISTS time_entries CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS outbox_events CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS tombstones CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS jobs CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS tags CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS suggestions CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS rates CASCADE;")
         cursor.execute("DROP TABLE IF EXISTS projects CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS workspace_members CASCADE;")
+        cursor.execute("DROP TABLE IF EXISTS workspaces CASCADE;")
         cursor.execute("DROP TABLE IF EXISTS users CASCADE;")
         
         print("Creating tables with updated schema...")
         
         cursor.execute("""
         CREATE TABLE users (
-            id VARCHAR(255) PRIMARY KEY,
+            id UUID PRIMARY KEY,
             email VARCHAR(255) UNIQUE NOT NULL,
             name VARCHAR(255) NOT NULL,
             hashed_password VARCHAR(255) NOT NULL,
             photo_url VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sync_seq BIGINT NOT NULL DEFAULT 0,
+            prevent_overlaps BOOLEAN NOT NULL DEFAULT FALSE,
+            idle_timeout_minutes INTEGER
+        );
+        """)
+        
+        cursor.execute("""
+        CREATE TABLE workspaces (
+            id UUID PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            owner_id UUID REFERENCES users(id)
         );
         """)
         
+        cursor.execute("""
+        CREATE TABLE workspace_members (
+            workspace_id UUID REFERENCES workspaces(id),
+            user_id UUID REFERENCES users(id),
+            role VARCHAR(20) NOT NULL DEFAULT 'member',
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (workspace_id, user_id)
+        );
+        """)
+        cursor.execute("CREATE INDEX ix_workspace_members_user_id ON workspace_members (user_id);")
+        
         cursor.execute("""
         CREATE TABLE projects (
-            id VARCHAR(255) PRIMARY KEY,
+            id UUID PRIMARY KEY,
             name VARCHAR(255) NOT NULL,
             description TEXT,
             color VARCHAR(50),
             is_archived BOOLEAN DEFAULT FALSE,
+            total_duration FLOAT NOT NULL DEFAULT 0,
+            entry_count INTEGER NOT NULL DEFAULT 0,
+            last_entry_at TIMESTAMP,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            user_id VARCHAR(255) REFERENCES users(id)
+            change_seq BIGINT NOT NULL DEFAULT 0,
+            user_id UUID REFERENCES users(id),
+            workspace_id UUID REFERENCES workspaces(id)
         );
         """)
+        cursor.execute("CREATE INDEX ix_projects_user_change_seq ON projects (user_id, change_seq);")
+        cursor.execute("CREATE INDEX ix_projects_workspace_id ON projects (workspace_id);")
+        
+        cursor.execute("""
+        CREATE TABLE rates (
+            id UUID PRIMARY KEY,
+            hourly_rate NUMERIC(12, 2) NOT NULL,
+            effective_from TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id UUID REFERENCES users(id),
+            project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+            created_by UUID REFERENCES users(id)
+        );
+        """)
+        cursor.execute("CREATE INDEX ix_rates_lookup ON rates (project_id, user_id, effective_from);")
+        
+        cursor.execute("""
+        CREATE TABLE tags (
+            id UUID PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            normalized VARCHAR(255) NOT NULL,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id UUID NOT NULL REFERENCES users(id)
+        );
+        """)
+        cursor.execute("CREATE UNIQUE INDEX uq_tags_user_name ON tags (user_id, name);")
+        cursor.execute("CREATE INDEX ix_tags_user_normalized ON tags (user_id, normalized text_pattern_ops);")
+        
+        cursor.execute("""
+        CREATE TABLE suggestions (
+            id UUID PRIMARY KEY,
+            description TEXT NOT NULL,
+            project_id UUID REFERENCES projects(id) ON DELETE SET NULL,
+            tags TEXT DEFAULT '[]',
+            use_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP NOT NULL,
+            user_id UUID NOT NULL REFERENCES users(id)
+        );
+        """)
+        cursor.execute("CREATE UNIQUE INDEX uq_suggestions_user_description ON suggestions (user_id, description);")
+        cursor.execute("CREATE INDEX ix_suggestions_user_last_used ON suggestions (user_id, last_used_at);")
+        
+        cursor.execute("""
+        CREATE TABLE outbox_events (
+            id SERIAL PRIMARY KEY,
+            event_type VARCHAR(100) NOT NULL,
+            payload TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            dispatched_at TIMESTAMP,
+            last_error TEXT,
+            user_id UUID REFERENCES users(id)
+        );
+        """)
+        cursor.execute("""
+        CREATE INDEX ix_outbox_events_pending ON outbox_events (next_attempt_at, id)
+        WHERE dispatched_at IS NULL;
+        """)
+        
+        cursor.execute("""
+        CREATE TABLE tombstones (
+            id SERIAL PRIMARY KEY,
+            entity_type VARCHAR(50) NOT NULL,
+            entity_id UUID NOT NULL,
+            change_seq BIGINT NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id UUID REFERENCES users(id)
+        );
+        """)
+        cursor.execute("CREATE INDEX ix_tombstones_user_change_seq ON tombstones (user_id, change_seq);")
+        
+        cursor.execute("""
+        CREATE TABLE jobs (
+            id UUID PRIMARY KEY,
+            kind VARCHAR(50),
+            params TEXT,
+            status VARCHAR(20) DEFAULT 'queued',
+            result_path TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            user_id UUID REFERENCES users(id)
+        );
+        """)
+        cursor.execute("CREATE INDEX ix_jobs_user_id ON jobs (user_id);")
+        cursor.execute("CREATE INDEX ix_jobs_status_created ON jobs (status, created_at);")
+        
+        if partitioned:
+            with engine.begin() as sa_conn:
+                created = partitions.create_partitioned_table(sa_conn)
+            print(f"Created partitioned time_entries with {len(created)} monthly partitions")
+            print("Database tables created successfully")
+            conn.close()
+            return True
         
         cursor.execute("""
         CREATE TABLE time_entries (
-            id VARCHAR(255) PRIMARY KEY,
+            id UUID PRIMARY KEY,
             description TEXT,
             start_time TIMESTAMP NOT NULL,
             end_time TIMESTAMP,
@@ -64,11 +201,24 @@ def update_database_schema():
             tags TEXT DEFAULT '[]',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            user_id VARCHAR(255) REFERENCES users(id),
-            project_id VARCHAR(255) REFERENCES projects(id)
+            user_id UUID REFERENCES users(id),
+            project_id UUID REFERENCES projects(id) ON DELETE SET NULL,
+            idempotency_key VARCHAR(255),
+            change_seq BIGINT NOT NULL DEFAULT 0
         );
         """)
         
+        cursor.execute("CREATE INDEX ix_time_entries_project_start ON time_entries (project_id, start_time);")
+        cursor.execute("CREATE INDEX ix_time_entries_user_start ON time_entries (user_id, start_time);")
+        cursor.execute("CREATE INDEX ix_time_entries_user_change_seq ON time_entries (user_id, change_seq);")
+        cursor.execute("""
+        CREATE UNIQUE INDEX uq_time_entries_running_timer ON time_entries (user_id)
+        WHERE end_time IS NULL;
+        """)
+        cursor.execute("""
+        CREATE UNIQUE INDEX uq_time_entries_idempotency_key ON time_entries (user_id, idempotency_key);
+        """)
+        
         print("Database tables created successfully")
         conn.close()
         
@@ -78,7 +228,7 @@ def update_database_schema():
         return False
 
 if __name__ == "__main__":
-    if update_database_schema():
+    if update_database_schema(partitioned="--partitioned" in sys.argv):
         print("Database schema update completed successfully")
     else:
         print("Database schema update failed")
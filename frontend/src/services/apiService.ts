@@ -3,7 +3,7 @@ import { mockAuthApi, mockProjectApi, mockTimerApi, mockReportApi } from './mock
 import { UserLogin, UserRegister } from '../types/auth.types';
 import { ProjectCreate, ProjectUpdate } from '../types/project.types';
 import { TimerUpdate } from '../types/timer.types';
-import { ReportFilters } from './report.service';
+import { ReportFilters, toReportData, toReportRequest } from './report.service';
 
 const USE_MOCK_API = true; // Set to false to use real API
 
@@ -222,10 +222,8 @@ export const reportService = {
   generateReport: async (filters: ReportFilters) => {
     try {
       if (await checkBackendAvailability()) {
-        const response = await api.get('/reports/generate', {
-          params: filters
-        });
-        return response.data;
+        const response = await api.post('/reports/generate', toReportRequest(filters));
+        return toReportData(filters, response.data);
       } else {
         return mockReportApi.generateReport(filters);
       }
@@ -14,26 +14,113 @@ export interface ReportData {
   hours: number;
 }
 
+type ReportDimension = 'day' | 'week' | 'month' | 'project' | 'tag';
+
+interface ReportRow {
+  [dimension: string]: string | number | null;
+  total_duration: number;
+  entry_count: number;
+}
+
+interface GeneratedReport {
+  group_by: ReportDimension[];
+  total: { total_duration: number; entry_count: number; covered_duration: number };
+  groups: { dimensions: ReportDimension[]; rows: ReportRow[] }[];
+}
+
+const reportDimension = (filters: ReportFilters): ReportDimension => {
+  if (filters.reportType === 'project' || filters.reportType === 'tag') {
+    return filters.reportType;
+  }
+  return filters.groupBy;
+};
+
+// POST /reports/generate takes the filters and the dimensions to group by.
+export const toReportRequest = (filters: ReportFilters) => ({
+  filters: {
+    start_date: filters.startDate || undefined,
+    end_date: filters.endDate || undefined,
+    project_id: filters.projectId,
+  },
+  group_by: [reportDimension(filters)],
+});
+
+// The response has a group per grouping set; the chart shows the single-dimension one.
+export const toReportData = (filters: ReportFilters, report: GeneratedReport): ReportData[] => {
+  const dimension = reportDimension(filters);
+  const group = report.groups.find(
+    (g) => g.dimensions.length === 1 && g.dimensions[0] === dimension
+  );
+  return (group?.rows ?? []).map((row) => ({
+    name: String(row.project_name ?? row[dimension] ?? (dimension === 'tag' ? 'Untagged' : 'No Project')),
+    hours: row.total_duration / 3600,
+  }));
+};
+
 export const generateReport = async (filters: ReportFilters): Promise<ReportData[]> => {
   try {
-    const response = await api.get('/reports/generate', { params: filters });
-    return response.data;
+    const response = await api.post<GeneratedReport>('/reports/generate', toReportRequest(filters));
+    return toReportData(filters, response.data);
   } catch (error) {
     console.warn('Backend generateReport failed, using mock data');
     return fallbackReportService.generateReport(filters);
   }
 };
 
-export const exportReport = async (filters: ReportFilters, format: 'csv' | 'pdf'): Promise<Blob> => {
+interface Job {
+  id: string;
+  kind: 'report' | 'export';
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'expired';
+  error?: string | null;
+}
+
+const JOB_POLL_INITIAL_MS = 500;
+const JOB_POLL_MAX_MS = 5000;
+const JOB_WAIT_TIMEOUT_MS = 5 * 60 * 1000;
+
+const waitForJob = async (jobId: string): Promise<Job> => {
+  // Poll quickly at first for small exports, backing off for long ones.
+  const deadline = Date.now() + JOB_WAIT_TIMEOUT_MS;
+  let delay = JOB_POLL_INITIAL_MS;
+  for (;;) {
+    const response = await api.get<Job>(`/jobs/${jobId}`);
+    const job = response.data;
+    if (job.status === 'succeeded') {
+      return job;
+    }
+    if (job.status === 'failed' || job.status === 'expired') {
+      throw new Error(job.error || `Export job ${job.status}`);
+    }
+    if (Date.now() + delay > deadline) {
+      throw new Error('Export job timed out');
+    }
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    delay = Math.min(delay * 2, JOB_POLL_MAX_MS);
+  }
+};
+
+// The server exports CSV only.
+export const exportReport = async (filters: ReportFilters, format: 'csv' = 'csv'): Promise<Blob> => {
   try {
-    const response = await api.get(`/reports/export/${format}`, {
-      params: filters,
+    // Exports run as background jobs on the server; submit, poll, then download.
+    const submitted = await api.post<Job>('/jobs/', {
+      kind: 'export',
+      params: {
+        format,
+        start_date: filters.startDate,
+        end_date: filters.endDate,
+        project_id: filters.projectId,
+      },
+    });
+    const job = await waitForJob(submitted.data.id);
+    const response = await api.get(`/jobs/${job.id}/download`, {
       responseType: 'blob',
     });
     return response.data;
   } catch (error) {
-    console.warn(`Backend exportReport as ${format} failed, using mock data`);
-    return fallbackReportService.exportReport(filters, format);
+    // Unlike the summaries, a mock file would be mistaken for the user's data.
+    console.error(`Backend exportReport as ${format} failed`, error);
+    throw error;
   }
 };
 